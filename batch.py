@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+"""
+Render many (fractal, level, style) jobs from a manifest on a process pool.
+
+A manifest is a JSON or YAML file:
+
+    {
+      "cache_dir": "geometry_cache",
+      "defaults": {"export": "png", "size": 900, "cmap": "gist_rainbow"},
+      "jobs": [
+        {"fractal": "DragonCurve", "name": "dragon", "levels": [12, 14], "cmap": ["viridis", "magma"]},
+        {"fractal": "KochCurve", "name": "koch", "init_length": 500, "levels": "5,6", "export": ["png", "mp4"]}
+      ]
+    }
+
+Any of ``level(s)``, ``size``, ``cmap``, ``background``, ``line_color``,
+``line_width`` and ``export`` may be a list. A job expands to one render per
+combination. Every other key is a fixed setting: ``init_length``,
+``fractal_kwargs``, ``fps``, ``duration``, ``edges_per_frame``,
+``chunk_size``, ``tile_size``, ``lod_threshold``, ``coordinate_dtype``,
+``video_backend``, ``codec``, ``crf``, ``preset``, ``encoder_threads``,
+``output_dir``, and an ``output`` filename template such as
+``"{name}_L{level}_{cmap}.png"``.
+
+Geometry depends only on the fractal and level, never on styling. The
+distinct geometries are generated first, once each and in parallel, into
+the on-disk geometry cache. Every render then memory-maps its vertices from
+there.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import fractals
+import instrument
+from cli import BACKGROUND_PRESETS, LINE_COLOR_PRESETS, get_colormap, get_output_dir, parse_color, parse_levels
+
+
+# Style fields that may list several values; a job renders their cross product
+EXPANDED_FIELDS = ('level', 'size', 'cmap', 'background', 'line_color', 'line_width', 'export')
+
+JOB_DEFAULTS = {
+    'init_length': 10,
+    'fractal_kwargs': {},
+    'size': 900,
+    'cmap': 'gist_rainbow',
+    'background': 'black',
+    'line_color': None,
+    'line_width': 1,
+    'export': 'png',
+    'fps': 60,
+    'duration': None,
+    'edges_per_frame': None,
+    'chunk_size': None,
+    'tile_size': None,
+    'lod_threshold': 1.0,
+    'coordinate_dtype': 'float64',
+    'video_backend': 'auto',
+    'codec': 'libx264',
+    'crf': 18,
+    'preset': 'medium',
+    'encoder_threads': 0,
+    'output_dir': None,
+    'output': None,
+}
+
+
+def load_manifest(path):
+    """Read a JSON or YAML (``.yaml``/``.yml``, needs PyYAML) job manifest."""
+    path = Path(path)
+
+    with open(path) as f:
+        if path.suffix in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit('Error: PyYAML is required for YAML manifests. Install with: pip install pyyaml')
+            return yaml.safe_load(f)
+
+        return json.load(f)
+
+
+def expand_jobs(manifest):
+    """Flatten a manifest into a list of render tasks, one per job and style combination."""
+    defaults = {**JOB_DEFAULTS, **manifest.get('defaults', {})}
+    cache_dir = manifest.get('cache_dir', 'geometry_cache')
+    tasks = []
+
+    for index, job in enumerate(manifest['jobs']):
+        job = {**defaults, **job}
+        for keys in (('fractal',), ('level', 'levels')):
+            if not any(key in job for key in keys):
+                missing = ' or '.join(repr(key) for key in keys)
+                raise ValueError(f"Job {index} ({job.get('name', job.get('fractal'))!r}) is missing {missing}")
+
+        if 'levels' in job:
+            job['level'] = job.pop('levels')
+        if isinstance(job.get('level'), str):
+            job['level'] = parse_levels(job['level'])
+
+        if not hasattr(fractals, job['fractal']):
+            raise ValueError(f"Unknown fractal class {job['fractal']!r} in job {job.get('name')!r}")
+        job.setdefault('name', job['fractal'])
+
+        options = {field: job[field] if isinstance(job[field], list) else [job[field]] for field in EXPANDED_FIELDS}
+        # Fields with several values name the output, so combinations don't overwrite each other
+        varying = [field for field in EXPANDED_FIELDS if field not in ('level', 'export') and len(options[field]) > 1]
+
+        for values in itertools.product(*options.values()):
+            task = {**job, **dict(zip(EXPANDED_FIELDS, values)), 'cache_dir': cache_dir}
+
+            if task['output']:
+                file_name = task['output'].format(**task)
+            else:
+                parts = [task['name'], f"level{task['level']}"] + [str(task[field]).lstrip('#') for field in varying]
+                file_name = f"{'_'.join(parts)}.{task['export']}"
+
+            output_dir = Path(task['output_dir']) if task['output_dir'] else get_output_dir(task['export'])
+            output_dir.mkdir(parents=True, exist_ok=True)
+            task['output_file'] = str(output_dir / file_name)
+            tasks.append(task)
+
+    return tasks
+
+
+# Fractal instances of this worker process, reused across its tasks so their level caches carry over
+_FRACTALS = {}
+
+
+def _get_fractal(task):
+    key = (task['fractal'], task['init_length'], json.dumps(task['fractal_kwargs'], sort_keys=True))
+
+    if key not in _FRACTALS:
+        _FRACTALS[key] = getattr(fractals, task['fractal'])(task['init_length'], **task['fractal_kwargs'])
+
+    return _FRACTALS[key]
+
+
+def _geometry_key(task):
+    return task['fractal'], task['init_length'], json.dumps(task['fractal_kwargs'], sort_keys=True), task['level']
+
+
+def warm_geometry(task):
+    """
+    Generate ``task``'s vertices into the geometry cache. Returns
+    ``{'status', 'seconds'}``, plus ``'error'`` instead of raising, so one bad
+    geometry only fails the renders that need it.
+    """
+    from geometry_cache import cached_coordinates
+
+    start = time.perf_counter()
+    try:
+        cached_coordinates(_get_fractal(task), task['level'], (0, 0), task['cache_dir'], task['chunk_size'] or 1 << 20)
+        result = {'status': 'ok'}
+    except Exception as error:
+        result = {'status': 'failed', 'error': f'{type(error).__name__}: {error}'}
+
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def render_task(task):
+    """Render one task; returns its report entry instead of raising, so one bad job doesn't stop the batch."""
+    from rendering_pygame import save_fractal, save_fractal_video
+    from tiled import save_fractal_tiled
+
+    result = {
+        'name': task['name'],
+        'fractal': task['fractal'],
+        'level': task['level'],
+        'export': task['export'],
+        'output_file': task['output_file'],
+        'pid': os.getpid(),
+    }
+
+    start = time.perf_counter()
+    try:
+        fractal = _get_fractal(task)
+        options = dict(
+            init_pos=(0, 0),
+            desired_recursion_level=task['level'],
+            output_file=task['output_file'],
+            size=(task['size'], task['size']),
+            line_width=task['line_width'],
+            cmap=get_colormap(task['cmap']),
+            background_color=parse_color(task['background'], BACKGROUND_PRESETS),
+            line_color=parse_color(task['line_color'], LINE_COLOR_PRESETS) if task['line_color'] else None,
+            chunk_size=task['chunk_size'],
+            cache_dir=task['cache_dir'],
+            lod_threshold=task['lod_threshold'],
+            coordinate_dtype=task['coordinate_dtype'],
+        )
+
+        if task['export'] == 'mp4':
+            save_fractal_video(
+                fractal,
+                edges_per_frame=task['edges_per_frame'],
+                duration=task['duration'],
+                fps=task['fps'],
+                video_backend=task['video_backend'],
+                video_options={
+                    'codec': task['codec'],
+                    'crf': task['crf'],
+                    'preset': task['preset'],
+                    'threads': task['encoder_threads'],
+                },
+                **options,
+            )
+        elif task['tile_size']:
+            save_fractal_tiled(fractal, tile_size=task['tile_size'], **options)
+        else:
+            save_fractal(fractal, **options)
+
+        result['status'] = 'ok'
+    except Exception as error:
+        result['status'] = 'failed'
+        result['error'] = f'{type(error).__name__}: {error}'
+
+    result['seconds'] = time.perf_counter() - start
+    if result['status'] == 'ok':
+        result['edges'] = fractal.edge_count(task['level'])
+
+    return result
+
+
+def run_batch(tasks, workers=None):
+    """
+    Run ``tasks`` (from ``expand_jobs``) on ``workers`` processes (default: one
+    per core) and return the report: per-task results plus batch timings.
+    """
+    workers = workers or os.cpu_count() or 1
+    batch_start = time.perf_counter()
+
+    # Distinct geometries, in first-use order
+    geometry = {}
+    for task in tasks:
+        if task['cache_dir']:
+            geometry.setdefault(_geometry_key(task), task)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        geometry_start = time.perf_counter()
+        failed_geometry = {}
+        if geometry:
+            instrument.event('generate_geometry', geometries=len(geometry), renders=len(tasks), workers=workers)
+            # Renders only start once their geometry is cached, so no two processes generate the same level
+            for key, result in zip(geometry, pool.map(warm_geometry, geometry.values())):
+                if result['status'] != 'ok':
+                    failed_geometry[key] = result['error']
+        geometry_seconds = time.perf_counter() - geometry_start
+
+        futures = {}
+        for i, task in enumerate(tasks):
+            error = failed_geometry.get(_geometry_key(task)) if task['cache_dir'] else None
+            if error is None:
+                futures[pool.submit(render_task, task)] = i
+                continue
+
+            # Its geometry could not be generated, so there is nothing to render
+            results.append((i, {
+                'name': task['name'],
+                'fractal': task['fractal'],
+                'level': task['level'],
+                'export': task['export'],
+                'output_file': task['output_file'],
+                'status': 'failed',
+                'error': f'geometry: {error}',
+                'seconds': 0.0,
+            }))
+
+        for done, future in enumerate(as_completed(futures), len(results) + 1):
+            result = future.result()
+            results.append((futures[future], result))
+            print(f"[{done}/{len(tasks)}] {result['status']:6} {result['seconds']:8.2f}s  {result['output_file']}")
+
+    # Report in manifest order
+    results = [result for _, result in sorted(results, key=lambda item: item[0])]
+    wall_seconds = time.perf_counter() - batch_start
+    render_seconds = sum(result['seconds'] for result in results)
+
+    return {
+        'workers': workers,
+        'tasks': len(tasks),
+        'failed': sum(result['status'] != 'ok' for result in results),
+        'geometry_count': len(geometry),
+        'geometry_seconds': geometry_seconds,
+        'render_seconds': render_seconds,
+        'wall_seconds': wall_seconds,
+        # Total work over wall time: how much the pool sped the batch up over one process
+        'speedup': (geometry_seconds + render_seconds) / wall_seconds if wall_seconds else 0.0,
+        'results': results,
+    }
+
+
+def print_summary(report):
+    """Print a per-task timing table and the batch totals."""
+    print()
+    print(f"{'status':8}{'seconds':>10}{'edges':>14}  output")
+    for result in report['results']:
+        edges = result.get('edges', '')
+        print(f"{result['status']:8}{result['seconds']:10.2f}{edges:>14}  {result['output_file']}")
+        if 'error' in result:
+            print(f"{'':32}{result['error']}")
+
+    print()
+    print(f"{report['tasks']} renders ({report['failed']} failed) on {report['workers']} workers")
+    print(f"Geometry: {report['geometry_count']} levels in {report['geometry_seconds']:.2f}s")
+    print(f"Rendering: {report['render_seconds']:.2f}s of work in {report['wall_seconds']:.2f}s wall "
+          f"({report['speedup']:.1f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Render a manifest of fractal jobs on a process pool',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python %(prog)s nightly.json                  # One worker per core
+  python %(prog)s nightly.yaml -j 4             # Four workers
+  python %(prog)s nightly.json --report report.json  # Also write the timing report as JSON
+        """
+    )
+    parser.add_argument('manifest', type=str, help='JSON or YAML job manifest')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='Worker processes (default: one per core)')
+    parser.add_argument('--report', type=str, default=None, help='Write the timing report to this JSON file')
+    args = parser.parse_args(argv)
+
+    tasks = expand_jobs(load_manifest(args.manifest))
+    report = run_batch(tasks, args.workers)
+    print_summary(report)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Report: {args.report}')
+
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
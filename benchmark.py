@@ -0,0 +1,255 @@
+#!/usr/bin/env python
+"""
+Benchmark every rendering stage for every fractal across a sweep of levels.
+
+Stages, timed separately:
+    generate      Fractal.generate on a fresh instance (no level cache)
+    coordinates   compute_coordinates
+    scale         scale_to_window
+    colors        color_lut + lut_colors
+    rasterize     draw_segments into a frame
+    png           PNG encoding of the frame
+    video         progressive draw + encoding of a short MP4
+
+Each stage is timed ``--repeat`` times and the fastest run is kept. Its
+peak memory is measured in one extra run under tracemalloc, which tracks
+NumPy buffers too. No display is needed.
+
+    python benchmark.py run -o before.json
+    python benchmark.py run -o after.json
+    python benchmark.py compare before.json after.json --threshold 0.10
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# Headless: pygame must not look for a display
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+
+import fractals
+from rendering_pygame import _record_progressive, color_lut, draw_segments, lut_colors, scale_to_window
+from video import BackgroundVideoWriter, open_video_writer
+
+
+STAGES = ('generate', 'coordinates', 'scale', 'colors', 'rasterize', 'png', 'video')
+
+# fractal class: (init_length, levels); sized so the largest level takes on the order of a second
+SWEEPS = {
+    'KochCurve': (500, [8, 12, 16]),
+    'HilbertCurve': (10, [4, 6, 8]),
+    'DragonCurve': (10, [10, 14, 18]),
+    'LevyCCurve': (400, [10, 14, 18]),
+    'SierpinskiArrowhead': (256, [6, 9, 11]),
+    'MooreCurve': (10, [4, 6, 8]),
+    'GosperCurve': (10, [3, 5, 6]),
+}
+
+# Smallest level of each sweep only, for a fast smoke run
+QUICK_SWEEPS = {name: (init_length, levels[:1]) for name, (init_length, levels) in SWEEPS.items()}
+
+
+def measure(fn, repeat):
+    """Run ``fn`` ``repeat`` times; returns ``(fastest seconds, peak traced bytes, last result)``."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+
+    # Separate run for memory, so tracing overhead doesn't skew the timings
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(times), peak, result
+
+
+def benchmark_level(fractal_class, init_length, level, size=(900, 900), repeat=3, stages=STAGES,
+                    video_backend='auto', video_frames=60):
+    """
+    Benchmark each of ``stages`` for one fractal level. Each stage gets the
+    previous stage's output as its input. Returns one result dict per stage.
+    """
+    import cv2
+    import matplotlib
+
+    cmap = matplotlib.colormaps['gist_rainbow']
+    results = []
+
+    def record(stage, fn):
+        if stage not in stages:
+            # Still needed as input for later stages, but not reported
+            return fn()
+
+        seconds, peak, result = measure(fn, repeat)
+        results.append({'stage': stage, 'seconds': seconds, 'peak_bytes': peak})
+        return result
+
+    edges = record('generate', lambda: fractal_class(init_length).generate(level))
+    n = len(edges)
+
+    fractal = fractal_class(init_length)
+    coords = record('coordinates', lambda: fractal.compute_coordinates(edges))
+    window_coords = record('scale', lambda: scale_to_window(coords, size))
+    colors = record('colors', lambda: lut_colors(color_lut(cmap, bgr=True), n))
+
+    def rasterize():
+        frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        return draw_segments(frame, window_coords, colors)
+
+    frame = record('rasterize', rasterize)
+    record('png', lambda: cv2.imencode('.png', frame)[1])
+
+    if 'video' in stages:
+        with tempfile.TemporaryDirectory(prefix='fractal_benchmark_') as tmp_dir:
+            output_file = os.path.join(tmp_dir, 'benchmark.mp4')
+
+            def encode():
+                out = BackgroundVideoWriter(open_video_writer(output_file, 30, size, video_backend))
+                video_frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+                lut = color_lut(cmap, bgr=True)
+                frames = _record_progressive(out, video_frame, iter([(0, window_coords)]), n,
+                                             max(1, -(-n // video_frames)), 1, lut)
+                out.release()
+                return frames
+
+            record('video', encode)
+
+    for result in results:
+        result.update({'fractal': fractal_class.__name__, 'level': level, 'edges': n})
+
+    return results
+
+
+def environment():
+    """Machine and code version the results were measured on."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run(args):
+    sweeps = QUICK_SWEEPS if args.quick else SWEEPS
+    names = args.fractals or list(sweeps)
+    stages = args.stages or list(STAGES)
+
+    results = []
+    for name in names:
+        if name not in sweeps:
+            raise SystemExit(f'Unknown fractal {name!r}; choose from {", ".join(sweeps)}')
+
+        init_length, levels = sweeps[name]
+        for level in args.levels or levels:
+            print(f'--{name} level {level}--')
+            level_results = benchmark_level(getattr(fractals, name), init_length, level, (args.size, args.size),
+                                            args.repeat, stages, args.video_backend)
+            for result in level_results:
+                print(f"  {result['stage']:12}{result['seconds'] * 1e3:10.2f} ms"
+                      f"{result['peak_bytes'] / 2 ** 20:10.1f} MiB")
+            results.extend(level_results)
+
+    report = {
+        'environment': environment(),
+        'settings': {'size': args.size, 'repeat': args.repeat, 'video_backend': args.video_backend},
+        'results': results,
+    }
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results: {args.output}')
+
+
+def compare(args):
+    """Print per-stage changes between two result files; exit 1 if any stage slowed down past the threshold."""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    def key(result):
+        return result['fractal'], result['level'], result['stage']
+
+    base = {key(result): result for result in baseline['results']}
+    regressions = 0
+
+    print(f"{'fractal':22}{'level':>6}  {'stage':12}{'base ms':>11}{'new ms':>11}{'change':>9}{'mem':>9}")
+    for result in candidate['results']:
+        before = base.get(key(result))
+        if before is None:
+            continue
+
+        ratio = result['seconds'] / before['seconds'] if before['seconds'] else 1.0
+        memory_ratio = result['peak_bytes'] / before['peak_bytes'] if before['peak_bytes'] else 1.0
+
+        # Sub-millisecond stages are mostly noise
+        regressed = ratio > 1 + args.threshold and result['seconds'] - before['seconds'] > args.min_seconds
+        regressions += regressed
+
+        print(f"{result['fractal']:22}{result['level']:>6}  {result['stage']:12}"
+              f"{before['seconds'] * 1e3:11.2f}{result['seconds'] * 1e3:11.2f}"
+              f"{ratio - 1:+9.0%}{memory_ratio - 1:+9.0%}{'  REGRESSION' if regressed else ''}")
+
+    print()
+    print(f'{regressions} regression(s) beyond {args.threshold:.0%}')
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark fractal generation and rendering stages')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks and write the results as JSON')
+    run_parser.add_argument('-o', '--output', type=str, default='benchmark.json', help='Results file')
+    run_parser.add_argument('--fractals', nargs='+', default=None, help='Fractal classes (default: all)')
+    run_parser.add_argument('--levels', type=int, nargs='+', default=None,
+                            help='Levels to run instead of each fractal\'s default sweep')
+    run_parser.add_argument('--stages', nargs='+', choices=STAGES, default=None, help='Stages (default: all)')
+    run_parser.add_argument('--quick', action='store_true', help='Only the smallest level of each sweep')
+    run_parser.add_argument('--size', type=int, default=900, help='Frame size in pixels (default: 900)')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage; fastest is kept (default: 3)')
+    run_parser.add_argument('--video-backend', choices=['auto', 'ffmpeg', 'opencv'], default='auto',
+                            help='Video writer for the video stage (default: auto)')
+
+    compare_parser = commands.add_parser('compare', help='Compare two results files')
+    compare_parser.add_argument('baseline', type=str)
+    compare_parser.add_argument('candidate', type=str)
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Slowdown that counts as a regression (default: 0.10 = 10%%)')
+    compare_parser.add_argument('--min-seconds', type=float, default=0.001,
+                                help='Ignore slowdowns smaller than this in absolute terms (default: 0.001)')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        run(args)
+        return 0
+
+    return compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
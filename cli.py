@@ -1,7 +1,8 @@
 import argparse
+import logging
 import os
 from pathlib import Path
-from matplotlib import cm
+import matplotlib
 
 
 # Output directories (relative to repo root)
@@ -74,7 +75,12 @@ Examples:
   python %(prog)s -l 7 --export mp4             # Export to MP4 video
   python %(prog)s -l 7 -d 30                    # Render over 30 seconds
   python %(prog)s -l 7 -d 10 --export mp4       # 10-second MP4 video
+  python %(prog)s -l 7 --export mp4 --codec libx265 --crf 24 --preset slow  # Smaller MP4 via ffmpeg
   python %(prog)s -l 7 -o my_fractal.png        # Custom output filename
+  python %(prog)s -l 20 --export png --chunk-size 1000000  # Stream a huge level
+  python %(prog)s -l 12 --export png --cache-dir cache     # Reuse geometry across renders
+  python %(prog)s -l 16 --export png --size 40000 --tile-size 2048 --workers 8  # Gigapixel print export
+  python %(prog)s -l 18 --export png --metrics stages.jsonl --trace-memory  # Per-stage timings as JSON lines
 
 Color options:
   python %(prog)s -l 5 --bg navy                # Navy background
@@ -163,6 +169,107 @@ Color options:
         help='Frames per second for display/video (default: 60)'
     )
 
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=None,
+        help='Stream PNG/MP4 exports in chunks of this many edges instead of generating the whole level in memory'
+    )
+
+    parser.add_argument(
+        '--video-backend',
+        type=str,
+        choices=['auto', 'ffmpeg', 'opencv'],
+        default='auto',
+        help='MP4 encoder: ffmpeg (libx264/libx265/VP9 over a pipe), opencv (mp4v), or auto (ffmpeg if installed)'
+    )
+
+    parser.add_argument(
+        '--codec',
+        type=str,
+        default='libx264',
+        help='ffmpeg video codec: libx264, libx265 or libvpx-vp9 (default: libx264)'
+    )
+
+    parser.add_argument(
+        '--crf',
+        type=int,
+        default=18,
+        help='ffmpeg constant rate factor; higher means smaller files (default: 18)'
+    )
+
+    parser.add_argument(
+        '--preset',
+        type=str,
+        default='medium',
+        help='ffmpeg encoder preset, e.g. ultrafast, medium, slow (VP9: cpu-used 0-8, or a preset name) (default: medium)'
+    )
+
+    parser.add_argument(
+        '--encoder-threads',
+        type=int,
+        default=0,
+        help='ffmpeg encoder threads, 0 = all cores (default: 0)'
+    )
+
+    parser.add_argument(
+        '--lod-threshold',
+        type=float,
+        default=1.0,
+        help='Merge consecutive edges that stay within cells of this many pixels before drawing; '
+             '0 draws every edge (default: 1.0)'
+    )
+
+    parser.add_argument(
+        '--coordinate-dtype',
+        choices=['float64', 'float32'],
+        default='float64',
+        help='Precision of the vertex coordinates; float32 halves their memory on huge levels (default: float64)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Render single-level MP4 frames, or PNG tiles with --tile-size, on this many processes (default: 1)'
+    )
+
+    parser.add_argument(
+        '--tile-size',
+        type=int,
+        default=None,
+        help='Render PNGs in square tiles of this many pixels, streaming them to disk '
+             '(for images too large to hold in memory)'
+    )
+
+    parser.add_argument(
+        '--cache-dir',
+        type=str,
+        default=None,
+        help='Directory for cached fractal geometry; re-renders that only change styling skip generation'
+    )
+
+    parser.add_argument(
+        '--progress',
+        type=str,
+        choices=['log', 'bar', 'none'],
+        default='log',
+        help='Report pipeline stages as log lines, as progress bars, or not at all (default: log)'
+    )
+
+    parser.add_argument(
+        '--metrics',
+        type=str,
+        default=None,
+        help='Append per-stage timings (seconds, edges, edges/s) to this file as JSON lines'
+    )
+
+    parser.add_argument(
+        '--trace-memory',
+        action='store_true',
+        help='Also record bytes allocated and peak memory per stage (slower)'
+    )
+
     return parser
 
 
@@ -178,10 +285,45 @@ def parse_levels(level_str):
 
 def get_colormap(cmap_name):
     """Get matplotlib colormap by name."""
-    return cm.get_cmap(cmap_name)
+    return matplotlib.colormaps[cmap_name]
+
+
+def instrumentation_sinks(args):
+    """Instrumentation sinks selected by the ``--progress`` and ``--metrics`` arguments."""
+    import instrument
+
+    sinks = []
+    if args.progress == 'log':
+        logging.basicConfig(level=logging.INFO, format='%(message)s')
+        sinks.append(instrument.LoggingSink())
+    elif args.progress == 'bar':
+        sinks.append(instrument.ProgressBarSink())
+
+    if args.metrics:
+        sinks.append(instrument.JSONLinesSink(args.metrics))
+
+    return sinks
 
 
 def run_fractal_demo(fractal_class, fractal_name, args, init_length=10, **fractal_kwargs):
+    """
+    Run the fractal demo with parsed arguments, reporting pipeline stages as
+    ``--progress`` and ``--metrics`` select.
+
+    Args:
+        fractal_class: The fractal class to instantiate
+        fractal_name: Name for output files
+        args: Parsed argparse namespace
+        init_length: Initial length for fractal
+        **fractal_kwargs: Additional kwargs for fractal constructor
+    """
+    import instrument
+
+    with instrument.recording(*instrumentation_sinks(args), memory=args.trace_memory):
+        _run_fractal_demo(fractal_class, fractal_name, args, init_length, **fractal_kwargs)
+
+
+def _run_fractal_demo(fractal_class, fractal_name, args, init_length=10, **fractal_kwargs):
     """
     Run the fractal demo with parsed arguments.
 
@@ -193,12 +335,19 @@ def run_fractal_demo(fractal_class, fractal_name, args, init_length=10, **fracta
         **fractal_kwargs: Additional kwargs for fractal constructor
     """
     from rendering_pygame import draw_fractal, save_fractal, save_fractal_video, save_multilevel_video
+    from tiled import save_fractal_tiled
 
     levels = parse_levels(args.level)
     cmap = get_colormap(args.cmap)
     window_size = (args.size, args.size)
     background_color = parse_color(args.background, BACKGROUND_PRESETS)
     line_color = parse_color(args.line_color, LINE_COLOR_PRESETS) if args.line_color else None
+    video_options = {
+        'codec': args.codec,
+        'crf': args.crf,
+        'preset': args.preset,
+        'threads': args.encoder_threads,
+    }
 
     if args.export == 'mp4' and len(levels) > 1:
         # Multiple levels -> single stitched video
@@ -223,13 +372,20 @@ def run_fractal_demo(fractal_class, fractal_name, args, init_length=10, **fracta
             edges_per_frame=args.edges_per_frame,
             duration=args.duration,
             fps=args.fps,
+            chunk_size=args.chunk_size,
+            cache_dir=args.cache_dir,
+            video_backend=args.video_backend,
+            video_options=video_options,
+            lod_threshold=args.lod_threshold,
+            coordinate_dtype=args.coordinate_dtype,
         )
         print(f"Saved: {output_file}")
         return
 
+    # One instance for all levels, so its level cache lets each level build on the previous one
+    fractal = fractal_class(init_length, **fractal_kwargs)
+
     for level in levels:
-        # Create fresh fractal instance for each level
-        fractal = fractal_class(init_length, **fractal_kwargs)
 
         if args.export == 'png':
             # Export to PNG (separate file per level)
@@ -240,8 +396,7 @@ def run_fractal_demo(fractal_class, fractal_name, args, init_length=10, **fracta
             else:
                 output_file = str(output_dir / f"{fractal_name}_level{level}.png")
 
-            save_fractal(
-                fractal,
+            png_options = dict(
                 init_pos=(0, 0),
                 desired_recursion_level=level,
                 output_file=output_file,
@@ -250,7 +405,17 @@ def run_fractal_demo(fractal_class, fractal_name, args, init_length=10, **fracta
                 cmap=cmap,
                 background_color=background_color,
                 line_color=line_color,
+                chunk_size=args.chunk_size,
+                cache_dir=args.cache_dir,
+                lod_threshold=args.lod_threshold,
+                coordinate_dtype=args.coordinate_dtype,
             )
+
+            if args.tile_size:
+                # Streamed tile by tile; the full image is never in memory
+                save_fractal_tiled(fractal, tile_size=args.tile_size, workers=args.workers, **png_options)
+            else:
+                save_fractal(fractal, **png_options)
             print(f"Saved: {output_file}")
 
         elif args.export == 'mp4':
@@ -274,6 +439,13 @@ def run_fractal_demo(fractal_class, fractal_name, args, init_length=10, **fracta
                 edges_per_frame=args.edges_per_frame,
                 duration=args.duration,
                 fps=args.fps,
+                chunk_size=args.chunk_size,
+                cache_dir=args.cache_dir,
+                video_backend=args.video_backend,
+                video_options=video_options,
+                workers=args.workers,
+                lod_threshold=args.lod_threshold,
+                coordinate_dtype=args.coordinate_dtype,
             )
             print(f"Saved: {output_file}")
 
@@ -291,4 +463,7 @@ def run_fractal_demo(fractal_class, fractal_name, args, init_length=10, **fracta
                 edges_per_frame=args.edges_per_frame,
                 duration=args.duration,
                 fps=args.fps,
+                lod_threshold=args.lod_threshold,
+                coordinate_dtype=args.coordinate_dtype,
+                chunk_size=args.chunk_size,
             )
@@ -1,22 +1,281 @@
+from collections import OrderedDict
 from typing import Callable
-from tqdm.auto import tqdm
 import numpy as np
 
+import instrument
+
+
+class EdgeArray:
+    """
+    Compact edge store backed by two parallel NumPy arrays: edge lengths and
+    edge angles (in degrees).
+
+    Indexing with an integer or iterating yields the old ``{'length', 'angle'}``
+    dicts, so code written against the list-of-dicts representation keeps
+    working. Use ``to_dicts()`` to get a real list when one is needed.
+    """
+
+    def __init__(self, lengths, angles):
+
+        self.lengths = np.asarray(lengths, dtype=np.float64)
+        self.angles = np.asarray(angles, dtype=np.float64)
+
+        if self.lengths.shape != self.angles.shape or self.lengths.ndim != 1:
+            raise ValueError('lengths and angles must be 1-D arrays of the same length')
+
+    @classmethod
+    def from_dicts(cls, edges: list[dict]) -> 'EdgeArray':
+        lengths = np.fromiter((e['length'] for e in edges), dtype=np.float64, count=len(edges))
+        angles = np.fromiter((e['angle'] for e in edges), dtype=np.float64, count=len(edges))
+        return cls(lengths, angles)
+
+    @classmethod
+    def concatenate(cls, edge_arrays) -> 'EdgeArray':
+        edge_arrays = list(edge_arrays)
+        return cls(
+            np.concatenate([e.lengths for e in edge_arrays]),
+            np.concatenate([e.angles for e in edge_arrays]),
+        )
+
+    def to_dicts(self) -> list[dict]:
+        """Compatibility view: the edges as a list of ``{'length', 'angle'}`` dicts."""
+        return [
+            {'length': length, 'angle': angle}
+            for length, angle in zip(self.lengths.tolist(), self.angles.tolist())
+        ]
+
+    def copy(self) -> 'EdgeArray':
+        return EdgeArray(self.lengths.copy(), self.angles.copy())
+
+    @property
+    def nbytes(self) -> int:
+        return self.lengths.nbytes + self.angles.nbytes
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __getitem__(self, idx):
+
+        if isinstance(idx, slice):
+            return EdgeArray(self.lengths[idx], self.angles[idx])
+
+        return {'length': float(self.lengths[idx]), 'angle': float(self.angles[idx])}
+
+    def __iter__(self):
+        return iter(self.to_dicts())
+
+    def __repr__(self):
+        return f'EdgeArray(n={len(self)})'
+
+
+def as_edge_array(edges) -> EdgeArray:
+    """Accept either an ``EdgeArray`` or a list of ``{'length', 'angle'}`` dicts."""
+    if isinstance(edges, EdgeArray):
+        return edges
+    return EdgeArray.from_dicts(edges)
+
+
+class LevelCache:
+    """
+    Memory-bounded LRU cache of generated levels, keyed by recursion level.
+
+    Values only need an ``nbytes`` attribute (``EdgeArray`` or an ndarray). A
+    value larger than ``max_bytes`` is not cached at all. Cached values are
+    shared with callers, so treat them as read-only.
+    """
+
+    def __init__(self, max_bytes):
+
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, level):
+
+        if level not in self._entries:
+            return None
+
+        self._entries.move_to_end(level)
+        return self._entries[level]
+
+    def put(self, level, value):
+
+        if level in self._entries:
+            self.nbytes -= self._entries.pop(level).nbytes
+
+        if value.nbytes > self.max_bytes:
+            return
+
+        self._entries[level] = value
+        self.nbytes += value.nbytes
+
+        # Evict least recently used levels until we fit again
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def deepest(self, max_level):
+        """Highest cached level that is ``<= max_level``, or None."""
+        levels = [level for level in self._entries if level <= max_level]
+        return max(levels) if levels else None
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def __contains__(self, level):
+        return level in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _rechunk(pieces, chunk_size):
+    """Regroup a stream of ``EdgeArray`` pieces into chunks of exactly ``chunk_size`` edges (the last may be shorter)."""
+    buffered = []
+    count = 0
+
+    for piece in pieces:
+        while len(piece):
+            take = min(chunk_size - count, len(piece))
+            buffered.append(piece[:take])
+            count += take
+            piece = piece[take:]
+
+            if count == chunk_size:
+                yield EdgeArray.concatenate(buffered)
+                buffered = []
+                count = 0
+
+    if count:
+        yield EdgeArray.concatenate(buffered)
+
+
+_SQRT_HALF = np.sqrt(0.5)
+_SQRT_3_HALF = np.sqrt(3) / 2
+
+# (angle step, integer step of each heading k * step, float (x, y) of each basis vector).
+# Tried in order, so curves on the square lattice get the smallest basis.
+HEADING_LATTICES = (
+    # Square lattice: Hilbert, Moore, Dragon
+    (90, np.array([(1, 0), (0, 1), (-1, 0), (0, -1)], dtype=np.int32),
+     np.array([(1, 0), (0, 1)], dtype=np.float64)),
+    # Triangular lattice spanned by the 0 and 60 degree headings: Gosper, Sierpinski arrowhead
+    (60, np.array([(1, 0), (0, 1), (-1, 1), (-1, 0), (0, -1), (1, -1)], dtype=np.int32),
+     np.array([(1, 0), (0.5, _SQRT_3_HALF)], dtype=np.float64)),
+    # Square lattice plus its 45-degree rotation: Koch, Levy C
+    (45, np.array([(1, 0, 0, 0), (0, 0, 1, 0), (0, 1, 0, 0), (0, 0, 0, 1),
+                   (-1, 0, 0, 0), (0, 0, -1, 0), (0, -1, 0, 0), (0, 0, 0, -1)], dtype=np.int32),
+     np.array([(1, 0), (0, 1), (_SQRT_HALF, _SQRT_HALF), (-_SQRT_HALF, _SQRT_HALF)], dtype=np.float64)),
+)
+
+
+# Edges per block of the coordinate pipeline, so its temporaries stay this size whatever the level
+COORDINATE_BLOCK = 1 << 16
+
+
+def heading_lattice(edges: EdgeArray):
+    """
+    The first ``HEADING_LATTICES`` entry ``(step, directions, basis)`` on
+    which all ``edges`` lie: equal lengths, and every heading a multiple of
+    ``step``. Returns None if there is none. The check runs a block at a
+    time and stops at the first miss, so a miss usually costs one block.
+    """
+    n = len(edges)
+    if n == 0:
+        return None
+
+    blocks = range(0, n, COORDINATE_BLOCK)
+    unit = edges.lengths[0]
+    if not all(np.all(edges.lengths[b:b + COORDINATE_BLOCK] == unit) for b in blocks):
+        return None
+
+    def on_lattice(step, b):
+        turns = edges.angles[b:b + COORDINATE_BLOCK] / step
+        return np.all(np.floor(turns) == turns)
+
+    for step, directions, basis in HEADING_LATTICES:
+        if all(on_lattice(step, b) for b in blocks):
+            return step, directions, basis
+
+    return None
+
+
+# Most distinct headings the O(level) ``bounds`` recursions track before falling back to a pass over the coordinates
+BOUNDS_MAX_HEADINGS = 4096
+
+
+def _heading_key(angle):
+    """``angle`` reduced to [0, 360), rounded so headings reached by different turn sums compare equal."""
+    return round(angle % 360, 9) % 360
+
+
+def _edge_extent(length, angle):
+    """
+    Extent of one edge: ``(min_x, min_y, max_x, max_y, dx, dy)`` of its
+    vertices relative to its start, and its end. Multiples of 90 degrees get
+    exact unit steps, like the square heading lattice.
+    """
+    quarter, rest = divmod(angle, 90)
+    if rest == 0:
+        cos, sin = ((1.0, 0.0), (0.0, 1.0), (-1.0, 0.0), (0.0, -1.0))[int(quarter) % 4]
+    else:
+        radians = np.deg2rad(angle)
+        cos, sin = float(np.cos(radians)), float(np.sin(radians))
+
+    dx, dy = length * cos, length * sin
+    return min(0.0, dx), min(0.0, dy), max(0.0, dx), max(0.0, dy), dx, dy
+
+
+def _join_extents(extents):
+    """Extent of the paths described by ``extents`` drawn one after the other."""
+    min_x = min_y = max_x = max_y = x = y = 0.0
+
+    for part_min_x, part_min_y, part_max_x, part_max_y, dx, dy in extents:
+        min_x = min(min_x, x + part_min_x)
+        min_y = min(min_y, y + part_min_y)
+        max_x = max(max_x, x + part_max_x)
+        max_y = max(max_y, y + part_max_y)
+        x += dx
+        y += dy
+
+    return min_x, min_y, max_x, max_y, x, y
+
+
+def _extent_bounds(extent, start_pos):
+    """``(mins, maxs)`` of a path with ``extent`` that starts at ``start_pos``."""
+    min_x, min_y, max_x, max_y = extent[:4]
+    x, y = start_pos
+    return np.array([x + min_x, y + min_y]), np.array([x + max_x, y + max_y])
+
+
 class Fractal:
 
-    def __init__(self, init_length: int, init_angle: int, fractal_update_func: Callable, init_edges: list[dict]=None):
+    # Subclasses that can build any slice of a level directly (``edge_range``) set this,
+    # so streaming never has to materialize the whole level
+    random_access = False
+
+    # Subclasses that compute vertices straight from their index (``vertex_range``) set this, so coordinates
+    # skip the edge angles and the running sum that would rebuild the same points
+    direct_vertices = False
+
+    # Memory budget of the per-instance level cache (see ``LevelCache``)
+    level_cache_bytes = 512 * 2 ** 20
+
+    def __init__(self, init_length: int, init_angle: int, fractal_update_func: Callable, init_edges=None):
 
         self.init_length = init_length
         self.init_angle = init_angle
 
         if init_edges is None:
-            self.init_edges = [{'length': self.init_length, 'angle': self.init_angle}]
+            self.init_edges = EdgeArray([self.init_length], [self.init_angle])
         else:
-            self.init_edges = init_edges
+            self.init_edges = as_edge_array(init_edges)
 
         self.edges = self.init_edges.copy()
         self.fractal_update_func = fractal_update_func
         self.current_recursion_level = 0
+        self.level_cache = LevelCache(self.level_cache_bytes)
 
     def reset(self):
 
@@ -25,295 +284,886 @@ class Fractal:
 
     def update(self):
 
-        starting_edges = self.edges.copy()
-
-        if self.current_recursion_level == 0:
-            print(f'Current Recursion Level: {self.current_recursion_level+1}', end='')
-        else:
-            print(f'-->{self.current_recursion_level+1}', end='')
-
-        new_edges = self.fractal_update_func(starting_edges)
+        # Update functions build new arrays and never mutate their input, so no copy is needed
+        new_edges = self.fractal_update_func(self.edges)
 
         self.edges = new_edges
         self.current_recursion_level += 1
 
     def generate(self, desired_recursion_level):
+        """
+        Return the edges of ``desired_recursion_level``.
+
+        Every level produced on the way is kept in ``level_cache``. The
+        instance also stays at the requested level instead of resetting. So
+        asking for levels 3, 4, ..., 12 in order pays for each expansion step
+        only once.
+        """
+        cached = self.level_cache.get(desired_recursion_level)
+        if cached is not None:
+            return cached
+
+        # Resume from the deepest level we still have at or below the target
+        if self.current_recursion_level > desired_recursion_level:
+            self.reset()
 
-        if desired_recursion_level == self.current_recursion_level:
-            print()
+        cached_level = self.level_cache.deepest(desired_recursion_level)
+        if cached_level is not None and cached_level > self.current_recursion_level:
+            self.edges = self.level_cache.get(cached_level)
+            self.current_recursion_level = cached_level
+
+        with instrument.stage('generate', total=desired_recursion_level - self.current_recursion_level, unit='levels',
+                              fractal=type(self).__name__, level=desired_recursion_level) as stage:
+            while self.current_recursion_level < desired_recursion_level:
+                self.update()
+                self.level_cache.put(self.current_recursion_level, self.edges)
+                stage.advance()
+            stage.edges = len(self.edges)
+
+        return self.edges
+
+    def compute_coordinates(self, edges, start_pos=(0, 0), dtype=np.float64, out=None):
+        """
+        Convert edges to absolute (x, y) coordinates using vectorized NumPy.
+
+        The (n + 1, 2) result has ``dtype`` and is written into ``out`` when
+        given. This is where the renderers' ``coordinate_dtype`` ends up:
+        float32 halves the largest array of a render, and its 24-bit mantissa
+        leaves window coordinates far finer than a pixel. Edges are processed
+        ``COORDINATE_BLOCK`` at a time with running sums carried in float64 or
+        as exact integers. Temporaries therefore stay block-sized, and float32
+        output doesn't pick up float32 rounding along the curve.
+
+        Equal-length edges on a heading lattice (see ``heading_lattice``) are
+        summed as integer steps, with no trig per edge. Each vertex is then a
+        couple of float operations away from an exact lattice point, so
+        rounding error doesn't accumulate along the curve, and square-lattice
+        curves like Moore land exactly on multiples of their edge length.
+        Other edges go through cos/sin and a float cumsum.
+        """
+        edges = as_edge_array(edges)
+        n = len(edges)
 
-            finished_edges = self.edges.copy()
-            self.reset()
+        coords = np.empty((n + 1, 2), dtype=dtype) if out is None else out
+        coords[0] = start_pos
+
+        lattice = heading_lattice(edges)
+        if lattice is not None:
+            step, directions, basis = lattice
+            k = len(directions)
+
+            # Float offset of one step along each basis vector, per output column
+            scales = edges.lengths[0] * basis
+            totals = np.zeros(len(basis), dtype=np.int64)
+            counts = np.empty((len(basis), COORDINATE_BLOCK), dtype=np.int64)
+
+            for start in range(0, n, COORDINATE_BLOCK):
+                stop = min(start + COORDINATE_BLOCK, n)
+                m = stop - start
+
+                heading = (edges.angles[start:stop] / step).astype(np.int64)
+                heading = heading & (k - 1) if k & (k - 1) == 0 else heading % k
+
+                # Steps taken along each basis vector up to each vertex
+                for axis, column in enumerate(directions.T):
+                    np.cumsum(column.take(heading), out=counts[axis, :m])
+                    counts[axis, :m] += totals[axis]
+                totals = counts[:, m - 1].copy()
+
+                for col in (0, 1):
+                    terms = [(row[:m], scale) for row, scale in zip(counts, scales[:, col]) if scale != 0]
+                    x = terms[0][0] * terms[0][1]
+                    for row, scale in terms[1:]:
+                        x += row * scale
+                    x += start_pos[col]
+                    coords[start + 1:stop + 1, col] = x
+
+            return coords
+
+        # Running sums of dx and dy, without the start position
+        totals = [0.0, 0.0]
+
+        for start in range(0, n, COORDINATE_BLOCK):
+            stop = min(start + COORDINATE_BLOCK, n)
+
+            # Convert to radians
+            radians = np.deg2rad(edges.angles[start:stop])
+            lengths = edges.lengths[start:stop]
+
+            for col, component in enumerate((np.cos, np.sin)):
+                # Compute dx (dy) for each edge and sum up to absolute positions
+                steps = lengths * component(radians)
+                steps[0] += totals[col]
+                np.cumsum(steps, out=steps)
+                totals[col] = steps[-1]
+                steps += start_pos[col]
+                coords[start + 1:stop + 1, col] = steps
+
+        return coords
+
+    def cache_params(self) -> dict:
+        """
+        JSON-serializable parameters that, together with the class and the
+        level, fully determine the generated geometry. Used as the key of the
+        on-disk geometry cache; subclasses with extra parameters extend it.
+        """
+        return {
+            'init_length': self.init_length,
+            'init_angle': self.init_angle,
+            'init_lengths': self.init_edges.lengths.tolist(),
+            'init_angles': self.init_edges.angles.tolist(),
+            'update_func': getattr(self.fractal_update_func, '__qualname__', repr(self.fractal_update_func)),
+        }
 
-            return finished_edges
+    def edge_count(self, level) -> int:
+        """Number of edges at ``level``. Subclasses override this with a closed form; the fallback generates the level."""
+        return len(self.generate(level))
+
+    def bounds(self, level, start_pos=(0, 0)):
+        """
+        Bounding box of the vertices of ``level`` as ``(mins, maxs)``, two
+        (2,) arrays, or None when it isn't known without generating the level.
+        Renderers fit the window to it before any geometry exists, so drawing
+        can start on the first chunk.
+
+        Subclasses override this with a closed form or an O(level) recursion
+        over the construction rule. Without one, renderers take the box from
+        the vertices they already hold, or from ``measure_bounds``.
+        """
+        return None
+
+    def measure_bounds(self, level, start_pos=(0, 0), cancelled=None):
+        """
+        Bounding box of ``level`` like ``bounds``, measured by streaming the
+        level once. Returns None as soon as the ``cancelled`` event is set.
+        """
+        mins = np.full(2, np.inf)
+        maxs = np.full(2, -np.inf)
+
+        with instrument.stage('bounds', edges=self.edge_count(level), level=level) as stage:
+            for coords in self.iter_coordinates(level, start_pos=start_pos):
+                if cancelled is not None and cancelled.is_set():
+                    stage.edges = stage.done
+                    return None
+                mins = np.minimum(mins, coords.min(axis=0))
+                maxs = np.maximum(maxs, coords.max(axis=0))
+                stage.advance(len(coords) - 1)
+
+        return mins, maxs
+
+    def iter_edges(self, level, chunk_size=1 << 16):
+        """
+        Stream the edges of ``level`` as ``EdgeArray`` chunks of ``chunk_size``
+        edges (the last chunk may be shorter).
+
+        Random-access and L-system fractals never hold more than about
+        ``chunk_size`` edges per recursion depth. Other fractals fall back to
+        generating the whole level and slicing it.
+        """
+        yield from _rechunk(self._iter_edge_pieces(level, chunk_size), chunk_size)
+
+    def _iter_edge_pieces(self, level, chunk_size):
+
+        if self.random_access:
+            n = self.edge_count(level)
+            for start in range(0, n, chunk_size):
+                yield self.edge_range(level, start, min(start + chunk_size, n))
 
         else:
-            self.update()
-            return self.generate(
-                desired_recursion_level=desired_recursion_level,
-            )
+            edges = self.generate(level)
+            for start in range(0, len(edges), chunk_size):
+                yield edges[start:start + chunk_size]
+
+    def coordinates(self, level, start_pos=(0, 0), dtype=np.float64):
+        """All vertices of ``level`` as one (n + 1, 2) array of ``dtype``."""
+        if self.direct_vertices:
+            n = self.edge_count(level)
+            with instrument.stage('coordinates', edges=n):
+                return self.vertex_range(level, 0, n + 1, start_pos=start_pos).astype(dtype, copy=False)
+
+        edges = self.generate(level)
+        with instrument.stage('coordinates', edges=len(edges)):
+            return self.compute_coordinates(edges, start_pos=start_pos, dtype=dtype)
+
+    def iter_coordinates(self, level, chunk_size=1 << 16, start_pos=(0, 0), dtype=np.float64):
+        """
+        Stream the vertices of ``level`` as (m + 1, 2) arrays of ``dtype``, one
+        per chunk of ``iter_edges``. Each chunk starts at the last vertex of the
+        previous one, so chunk ``k`` holds the endpoints of its ``m`` edges.
+        """
+        if self.direct_vertices:
+            n = self.edge_count(level)
+            for start in range(0, n, chunk_size):
+                yield self.vertex_range(level, start, min(start + chunk_size, n) + 1, start_pos).astype(dtype, copy=False)
+            return
+
+        pos = start_pos
+
+        for edges in self.iter_edges(level, chunk_size):
+            coords = self.compute_coordinates(edges, start_pos=pos)
+            # compute_coordinates allocates a fresh array per chunk, so consumers may transform the
+            # yielded chunk in place without a copy. Chunks start from the float64 position, so
+            # float32 chunks don't drift apart
+            pos = tuple(coords[-1])
+            yield coords.astype(dtype, copy=False)
+
+
+def substitute(edges: EdgeArray, offsets, scale: float) -> EdgeArray:
+    """
+    Replace every edge with ``len(offsets)`` children in one broadcast step.
 
-    def compute_coordinates(self, edges, start_pos=(0, 0)):
-        """Convert edges to absolute (x, y) coordinates using vectorized NumPy."""
-        n = len(edges)
+    Child ``j`` of an edge has angle ``parent_angle + offsets[j]`` and length
+    ``parent_length * scale``. Children stay in order, so the result is the
+    next level of the curve.
+    """
+    offsets = np.asarray(offsets, dtype=np.float64)
 
-        # Extract angles and lengths as numpy arrays
-        angles = np.array([e['angle'] for e in edges])
-        lengths = np.array([e['length'] for e in edges])
+    lengths = np.repeat(edges.lengths * scale, len(offsets))
+    angles = (edges.angles[:, np.newaxis] + offsets[np.newaxis, :]).ravel()
 
-        # Convert to radians
-        radians = np.deg2rad(angles)
+    return EdgeArray(lengths, angles)
 
-        # Compute dx, dy for each edge
-        dx = lengths * np.cos(radians)
-        dy = lengths * np.sin(radians)
 
-        # Build coordinate arrays with start position
-        x = np.zeros(n + 1)
-        y = np.zeros(n + 1)
-        x[0], y[0] = start_pos
+class SubstitutionFractal(Fractal):
+    """
+    Base class for edge-rewriting fractals. Subclasses only declare
+    ``offsets``, the angle offsets of each child edge relative to its parent,
+    and ``scale``, the child-to-parent length ratio.
 
-        # Cumulative sum to get absolute positions
-        x[1:] = x[0] + np.cumsum(dx)
-        y[1:] = y[0] + np.cumsum(dy)
+    Override ``offsets_for_level`` when the pattern changes from level to level.
+    """
 
-        return np.column_stack((x, y))
+    offsets = ()
+    scale = 1.0
+    random_access = True
 
-class KochCurve(Fractal):
+    def __init__(self, init_length, init_angle=0, init_edges=None):
+        super().__init__(
+            init_length=init_length,
+            init_angle=init_angle,
+            fractal_update_func=self.substitution_update,
+            init_edges=init_edges
+        )
 
-    def __init__(self, init_length, init_angle):
-        super().__init__(init_length=init_length, init_angle=init_angle, fractal_update_func=self.koch_update)
+    def offsets_for_level(self, level):
+        """Angle offsets used to produce recursion level ``level`` (1-based)."""
+        return self.offsets
+
+    def substitution_update(self, edges: EdgeArray) -> EdgeArray:
+        offsets = self.offsets_for_level(self.current_recursion_level + 1)
+        return substitute(edges, offsets, self.scale)
+
+    def cache_params(self) -> dict:
+        params = super().cache_params()
+        params['offsets'] = [list(self.offsets_for_level(level)) for level in (1, 2)]
+        params['scale'] = self.scale
+        return params
+
+    def edge_count(self, level) -> int:
+        return len(self.init_edges) * len(self.offsets) ** level
+
+    def edge_range(self, level, start, stop) -> EdgeArray:
+        """
+        Edges ``start`` to ``stop - 1`` of ``level`` without expanding the rest
+        of the level.
+
+        This is a depth-first walk of the substitution tree. The base-k digits
+        of an edge's index name the child taken at each depth, and its angle is
+        the root angle plus the offset picked by each digit.
+        """
+        k = len(self.offsets)
+        leaves_per_root = k ** level
+
+        indices = np.arange(start, stop, dtype=np.int64)
+        roots = indices // leaves_per_root
+        local = indices - roots * leaves_per_root
+
+        angles = self.init_edges.angles[roots]
+        lengths = self.init_edges.lengths[roots] * self.scale ** level
+
+        for depth in range(1, level + 1):
+            offsets = np.asarray(self.offsets_for_level(depth), dtype=np.float64)
+            digits = (local // k ** (level - depth)) % k
+            angles += offsets[digits]
+
+        return EdgeArray(lengths, angles)
+
+    def bounds(self, level, start_pos=(0, 0)):
+        """
+        Bounding box of ``level`` from the substitution rule alone, in
+        O(level) work.
+
+        All edges at one depth with the same heading grow into congruent
+        subcurves. So one extent per (depth, heading) is enough, and each
+        depth's extents join those of the depth below in ``offsets`` order.
+        Offsets that aren't a fraction of a turn reach too many headings, and
+        then there is no bound short of generating the level.
+        """
+        # Headings reachable at each depth, top-down
+        headings = [{_heading_key(angle) for angle in self.init_edges.angles.tolist()}]
+        for depth in range(1, level + 1):
+            offsets = self.offsets_for_level(depth)
+            headings.append({_heading_key(heading + offset) for heading in headings[-1] for offset in offsets})
+            if len(headings[-1]) > BOUNDS_MAX_HEADINGS:
+                return None
+
+        def root_extents(length):
+            """Extent of the level-``level`` subcurve of a root edge of ``length``, by heading."""
+            extents = {heading: _edge_extent(length * self.scale ** level, heading) for heading in headings[level]}
+            for depth in range(level, 0, -1):
+                offsets = self.offsets_for_level(depth)
+                extents = {
+                    heading: _join_extents([extents[_heading_key(heading + offset)] for offset in offsets])
+                    for heading in headings[depth - 1]
+                }
+            return extents
+
+        by_length = {}
+        roots = []
+        for length, angle in zip(self.init_edges.lengths.tolist(), self.init_edges.angles.tolist()):
+            if length not in by_length:
+                by_length[length] = root_extents(length)
+            roots.append(by_length[length][_heading_key(angle)])
+
+        return _extent_bounds(_join_extents(roots), start_pos)
+
+
+class LSystem:
+    """
+    Compiled L-system rewriting engine.
 
-    def koch_update(self, edges: list[dict]) -> list[dict]:
-        new_edges = []
+    The state is a uint8 array of symbol codes. Rewriting looks each symbol up
+    in a table and gathers its rule body from one concatenated array with
+    ``np.repeat``. The turtle reading turns symbols into turn deltas and takes
+    a cumulative sum to get headings. ``+`` turns by ``+angle`` and ``-`` by
+    ``-angle``; symbols in ``draw_symbols`` draw one edge forward.
+    """
+
+    def __init__(self, rules: dict[str, str], angle: float, draw_symbols: str):
+
+        self.rules = dict(rules)
+        self.angle = angle
+        self.draw_symbols = draw_symbols
+
+        alphabet = set('+-') | set(draw_symbols) | set(self.rules)
+        for body in self.rules.values():
+            alphabet |= set(body)
+
+        if len(alphabet) > 256:
+            raise ValueError('An L-system can use at most 256 distinct symbols')
+
+        self.symbols = sorted(alphabet)
+        self.codes = {symbol: code for code, symbol in enumerate(self.symbols)}
+
+        # Rewriting tables: symbols without a rule rewrite to themselves
+        bodies = [self.encode(self.rules.get(symbol, symbol)) for symbol in self.symbols]
+        self.rule_lengths = np.array([len(body) for body in bodies], dtype=np.int64)
+        self.rule_starts = np.concatenate([[0], np.cumsum(self.rule_lengths)[:-1]])
+        self.rule_bodies = np.concatenate(bodies)
+
+        # Turtle tables
+        self.turn_deltas = np.zeros(len(self.symbols), dtype=np.float64)
+        self.turn_deltas[self.codes['+']] = angle
+        self.turn_deltas[self.codes['-']] = -angle
+
+        self.draws = np.zeros(len(self.symbols), dtype=bool)
+        for symbol in draw_symbols:
+            self.draws[self.codes[symbol]] = True
+
+    def encode(self, state: str) -> np.ndarray:
+        return np.array([self.codes[symbol] for symbol in state], dtype=np.uint8)
+
+    def decode(self, state: np.ndarray) -> str:
+        return ''.join(self.symbols[code] for code in state.tolist())
+
+    def expand(self, state: np.ndarray) -> np.ndarray:
+        """Apply the rewriting rules to every symbol of ``state`` at once."""
+        counts = self.rule_lengths[state]
+        total = int(counts.sum())
+
+        # Position of each output symbol inside its own rule body...
+        block_starts = np.cumsum(counts) - counts
+        idx = np.arange(total, dtype=np.int64) - np.repeat(block_starts, counts)
+        # ...shifted to where that body lives in the concatenated table
+        idx += np.repeat(self.rule_starts[state], counts)
+
+        return self.rule_bodies[idx]
+
+    def iter_expanded(self, state: np.ndarray, levels: int, block_size: int):
+        """
+        Depth-first expansion: yield the state ``levels`` rewrites later, in
+        order, as consecutive pieces. At most one block of ``block_size``
+        symbols (times the longest rule) is held per depth.
+        """
+        if levels == 0:
+            yield state
+            return
+
+        for start in range(0, len(state), block_size):
+            yield from self.iter_expanded(self.expand(state[start:start + block_size]), levels - 1, block_size)
+
+    def count_draws(self, state: np.ndarray, levels: int) -> int:
+        """Number of drawing symbols ``levels`` rewrites after ``state``, without expanding it."""
+        counts = np.bincount(state, minlength=len(self.symbols)).tolist()
+
+        # Python ints, so deep levels cannot overflow
+        produces = [
+            np.bincount(self.rule_bodies[start:start + length], minlength=len(self.symbols)).tolist()
+            for start, length in zip(self.rule_starts.tolist(), self.rule_lengths.tolist())
+        ]
+        for _ in range(levels):
+            counts = [
+                sum(counts[i] * produces[i][j] for i in range(len(counts)) if counts[i])
+                for j in range(len(counts))
+            ]
+
+        return sum(count for count, draws in zip(counts, self.draws) if draws)
+
+    def extent(self, state: np.ndarray, levels: int, length: float, init_angle: float = 0):
+        """
+        Extent ``(min_x, min_y, max_x, max_y, dx, dy)`` of the path the turtle
+        draws ``levels`` rewrites after ``state``, without expanding it.
+
+        A symbol expanded ``j`` times always draws the same path from a given
+        heading. So per depth, each (symbol, heading) pair needs one extent,
+        joined from the extents of its rule body one depth below. Returns None
+        when ``angle`` reaches more than ``BOUNDS_MAX_HEADINGS`` headings.
+        """
+        # Every heading the turtle can face: init_angle plus whole turns of angle
+        headings = {_heading_key(init_angle)}
+        frontier = list(headings)
+        while frontier:
+            heading = frontier.pop()
+            for turned in (_heading_key(heading + self.angle), _heading_key(heading - self.angle)):
+                if turned not in headings:
+                    headings.add(turned)
+                    frontier.append(turned)
+            if len(headings) > BOUNDS_MAX_HEADINGS:
+                return None
+
+        codes = range(len(self.symbols))
+        bodies = [self.rule_bodies[start:start + count].tolist()
+                  for start, count in zip(self.rule_starts.tolist(), self.rule_lengths.tolist())]
+
+        # Unexpanded symbols: a turn, then an edge if the symbol draws
+        turns = self.turn_deltas.tolist()
+        extents = [
+            {heading: _edge_extent(length, _heading_key(heading + turns[code])) if self.draws[code] else
+             (0.0, 0.0, 0.0, 0.0, 0.0, 0.0) for heading in headings}
+            for code in codes
+        ]
+
+        def join(codes_in_order, extents, turns, heading):
+            parts = []
+            for code in codes_in_order:
+                parts.append(extents[code][heading])
+                heading = _heading_key(heading + turns[code])
+            return _join_extents(parts)
+
+        for _ in range(levels):
+            extents = [{heading: join(bodies[code], extents, turns, heading) for heading in headings} for code in codes]
+            turns = [_heading_key(sum(turns[child] for child in bodies[code])) for code in codes]
+
+        return join(state.tolist(), extents, turns, _heading_key(init_angle))
+
+    def to_edges(self, state: np.ndarray, length: float, init_angle: float = 0) -> EdgeArray:
+        """Run the turtle over ``state`` and return the drawn edges."""
+        headings = init_angle + np.cumsum(self.turn_deltas[state])
+        angles = headings[self.draws[state]]
+
+        return EdgeArray(np.full(len(angles), length, dtype=np.float64), angles)
+
+
+class KochCurve(SubstitutionFractal):
+
+    offsets = (45, -45)
+    scale = 1 / 2
+
+    def __init__(self, init_length, init_angle=0):
+        super().__init__(init_length=init_length, init_angle=init_angle)
+
+
+def _hilbert_tables():
+    """
+    State-machine form of the d2xy mapping, two index bits (one quadrant) at a time.
+
+    The state is the orientation of the current sub-square: 0 identity,
+    1 transpose, 2 anti-transpose, 3 rotate 180. These four transforms form
+    the whole orientation group of the curve. The tables are then folded so
+    that each lookup consumes four index bits (two levels).
+    """
+    def orient(state, bx, by):
+        return [(bx, by), (by, bx), (1 - by, 1 - bx), (1 - bx, 1 - by)][state]
+
+    compose = [[0, 1, 2, 3], [1, 0, 3, 2], [2, 3, 0, 1], [3, 2, 1, 0]]
+    quadrants = [(0, 0), (0, 1), (1, 1), (1, 0)]  # Visiting order of an identity-oriented cup
+    child_state = [1, 0, 0, 2]                     # Orientation of the sub-curve in each quadrant
+
+    bits_1 = np.zeros(16, dtype=np.uint8)
+    next_1 = np.zeros(16, dtype=np.uint8)
+    for state in range(4):
+        for digit in range(4):
+            bx, by = orient(state, *quadrants[digit])
+            bits_1[state * 4 + digit] = bx << 1 | by
+            next_1[state * 4 + digit] = compose[state][child_state[digit]]
+
+    bits_2 = np.zeros(64, dtype=np.uint8)
+    next_2 = np.zeros(64, dtype=np.uint8)
+    for state in range(4):
+        for digits in range(16):
+            hi = state * 4 + (digits >> 2)
+            lo = next_1[hi] * 4 + (digits & 3)
+            x = (bits_1[hi] >> 1) << 1 | bits_1[lo] >> 1
+            y = (bits_1[hi] & 1) << 1 | bits_1[lo] & 1
+            bits_2[state * 16 + digits] = x << 2 | y
+            next_2[state * 16 + digits] = next_1[lo]
+
+    return bits_1, next_1, bits_2, next_2
+
+
+_HILBERT_BITS_1, _HILBERT_NEXT_1, _HILBERT_BITS_2, _HILBERT_NEXT_2 = _hilbert_tables()
+
+
+def hilbert_d2xy(order, indices):
+    """
+    Map positions along a Hilbert curve of the given order (``4**order`` cells)
+    to integer ``(x, y)`` grid cells.
+
+    This is the standard d2xy mapping written as table lookups. It walks the
+    index from the most significant bits down, two levels per step, and is
+    vectorized over all indices at once.
+    """
+    d = np.asarray(indices, dtype=np.int64)
+    x = np.zeros(d.shape, dtype=np.int64)
+    y = np.zeros(d.shape, dtype=np.int64)
+    state = np.zeros(d.shape, dtype=np.uint8)
+
+    shift = 2 * order
+    if order % 2:
+        shift -= 2
+        lookup = ((d >> shift) & 3).astype(np.uint8)
+        cell = _HILBERT_BITS_1[lookup]
+        x |= cell >> 1
+        y |= cell & 1
+        state = _HILBERT_NEXT_1[lookup]
+
+    while shift > 0:
+        shift -= 4
+        lookup = (state << 4) | ((d >> shift) & 15).astype(np.uint8)
+        cell = _HILBERT_BITS_2[lookup]
+        x = (x << 2) | (cell >> 2)
+        y = (y << 2) | (cell & 3)
+        state = _HILBERT_NEXT_2[lookup]
+
+    return x, y
 
-        for edge in edges:
-            
-            new_edges.append({'length': edge['length']/2, 'angle': edge['angle'] + 45})
-            new_edges.append({'length': edge['length']/2, 'angle': edge['angle'] - 45})
 
-        return new_edges
-    
 class HilbertCurve(Fractal):
+    """
+    The Hilbert Curve - a space-filling curve that visits every cell of a
+    ``2**(level+1)`` square grid.
 
-    def __init__(self, init_length):
-        
-        self.triplet_map = {
-            'D': np.array([0  , 90 , 180]),
-            'A': np.array([90 , 0  , -90]),
-            'B': np.array([180, -90, 0  ]),
-            'C': np.array([-90, 180, 90 ]),
-        }
+    Vertices come straight from their index with ``hilbert_d2xy``, in
+    fixed-size chunks. Any level, vertex range or edge range is built directly,
+    without computing the levels below it.
+    """
+
+    random_access = True
+    direct_vertices = True
 
+    def __init__(self, init_length, chunk_size=1 << 20):
+        self.chunk_size = chunk_size
         super().__init__(init_length=init_length, init_angle=90, fractal_update_func=self.hilbert_update, init_edges=self.get_init_edges(init_length, 90))
 
     def get_init_edges(self, init_length, init_angle):
 
-        edge_1 = {'length': init_length, 'angle': init_angle    }
-        edge_2 = {'length': init_length, 'angle': init_angle-90 }
-        edge_3 = {'length': init_length, 'angle': init_angle-180}
-
-        init_edges = [edge_1, edge_2, edge_3]
+        init_edges = EdgeArray(
+            lengths=[init_length] * 3,
+            angles=[init_angle, init_angle - 90, init_angle - 180],
+        )
         return init_edges
 
-    def get_letter(self, triplet_angles):
-
-        which_triplet = np.all(np.array(list(self.triplet_map.values())) == np.broadcast_to(triplet_angles, shape=(4, 3)), axis=1)
-        letters = np.array(list(self.triplet_map.keys()))[:, np.newaxis]
-
-        letter = letters[which_triplet].squeeze().tolist()
-
-        return letter
-
-    def get_new_angles(self, triplet_letter):
-
-        angle_map = {
-            'A': np.concatenate(
-                [
-                    self.triplet_map['D'], 
-                    [90], 
-                    self.triplet_map['A'], 
-                    [0], 
-                    self.triplet_map['A'], 
-                    [270], 
-                    self.triplet_map['B']
-                ]
-            ),
-            'B': np.concatenate(
-                [
-                    self.triplet_map['C'], 
-                    [180], 
-                    self.triplet_map['B'], 
-                    [270], 
-                    self.triplet_map['B'], 
-                    [0], 
-                    self.triplet_map['A']
-                ]
-            ),
-            'C': np.concatenate(
-                [
-                    self.triplet_map['B'], 
-                    [270], 
-                    self.triplet_map['C'], 
-                    [180], 
-                    self.triplet_map['C'], 
-                    [90], 
-                    self.triplet_map['D']
-                ]
-            ),
-            'D': np.concatenate(
-                [
-                    self.triplet_map['A'], 
-                    [0], 
-                    self.triplet_map['D'], 
-                    [90], 
-                    self.triplet_map['D'], 
-                    [180], 
-                    self.triplet_map['C']
-                ]
-            ),
-        }
-
-        if triplet_letter:
-            new_angles = angle_map[triplet_letter]
-
-        else:
-            new_angles = []
+    @staticmethod
+    def order(level):
+        # Level 0 is the 2x2 "cup", i.e. a first-order Hilbert curve
+        return level + 1
+
+    def vertex_range(self, level, start, stop, start_pos=(0, 0)) -> np.ndarray:
+        """Vertices ``start`` to ``stop - 1`` of the level-``level`` curve as an (n, 2) float array."""
+        order = self.order(level)
+        vertices = np.empty((stop - start, 2), dtype=np.float64)
+
+        for chunk_start in range(start, stop, self.chunk_size):
+            chunk_stop = min(chunk_start + self.chunk_size, stop)
+            x, y = hilbert_d2xy(order, np.arange(chunk_start, chunk_stop, dtype=np.int64))
+            vertices[chunk_start - start:chunk_stop - start, 0] = start_pos[0] + x * self.init_length
+            vertices[chunk_start - start:chunk_stop - start, 1] = start_pos[1] + y * self.init_length
+
+        return vertices
+
+    def edge_count(self, level) -> int:
+        return 4 ** self.order(level) - 1
+
+    def bounds(self, level, start_pos=(0, 0)):
+        """Bounding box of ``level``: the curve visits every cell of its ``2**order`` square grid."""
+        far = (2 ** self.order(level) - 1) * self.init_length
+        corners = np.array([start_pos, (start_pos[0] + far, start_pos[1] + far)], dtype=np.float64)
+        return corners.min(axis=0), corners.max(axis=0)
+
+    def edge_range(self, level, start, stop) -> EdgeArray:
+        """Edges ``start`` to ``stop - 1`` of the level-``level`` curve."""
+        angles = np.empty(stop - start, dtype=np.float64)
+
+        for chunk_start in range(start, stop, self.chunk_size):
+            chunk_stop = min(chunk_start + self.chunk_size, stop)
+            x, y = hilbert_d2xy(self.order(level), np.arange(chunk_start, chunk_stop + 1, dtype=np.int64))
+
+            # Consecutive cells differ by exactly one unit step
+            dx = np.diff(x)
+            dy = np.diff(y)
+            angles[chunk_start - start:chunk_stop - start] = np.where(
+                dx != 0, np.where(dx > 0, 0, 180), np.where(dy > 0, 90, 270)
+            )
 
-        return new_angles
+        return EdgeArray(np.full(len(angles), self.init_length, dtype=np.float64), angles)
 
-    def hilbert_update(self, edges: list[dict]) -> list[dict]:
-        
-        # based on this very helpful diagram: https://en.wikipedia.org/wiki/Hilbert_curve#/media/File:Hilbert_curve_production_rules!.svg
-        angles = np.array([edge['angle'] for edge in edges])
+    def hilbert_update(self, edges: EdgeArray) -> EdgeArray:
+        level = self.current_recursion_level + 1
+        return self.edge_range(level, 0, self.edge_count(level))
 
-        new_edges = []
-        i = 0
+    def generate(self, desired_recursion_level):
+        edges = self.level_cache.get(desired_recursion_level)
 
-        while i < len(angles)-2:
+        if edges is None:
+            # Jump straight to the requested level instead of building every level below it
+            n = self.edge_count(desired_recursion_level)
+            with instrument.stage('generate', edges=n, fractal=type(self).__name__, level=desired_recursion_level):
+                edges = self.edge_range(desired_recursion_level, 0, n)
+            self.level_cache.put(desired_recursion_level, edges)
 
-            triplet = angles[i:i+3]
-            letter = self.get_letter(triplet)
-            new_angles = self.get_new_angles(letter)
+        return edges
 
-            if len(new_angles) > 0:
 
-                new_triplet_edges = [
-                    {'length': self.init_length, 'angle': angle}
-                    for angle in new_angles
-                ]
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Number of set bits in each element of a non-negative integer array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
 
-                if len(angles) > 3 and (i + 3) < len(angles):
-                    new_triplet_edges += [{'length': self.init_length, 'angle': angles[i+3]}]
+    # NumPy < 2.0: count bits one byte at a time through a lookup table
+    byte_counts = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    as_bytes = np.ascontiguousarray(values, dtype=np.uint64).view(np.uint8)
+    return byte_counts[as_bytes].reshape(-1, 8).sum(axis=1)
 
-                new_edges += new_triplet_edges
-                i += 4
 
-            else:
-                continue
+def dragon_headings(indices) -> np.ndarray:
+    """
+    Heading of edge ``n``, in quarter turns (0-3), without summing the turns
+    before it.
 
-        return new_edges
+    The running sum of the paper-folding turns equals the popcount of the Gray
+    code ``n ^ (n >> 1)``, modulo 4.
+    """
+    n = np.asarray(indices, dtype=np.int64)
+    return (_popcount(n ^ (n >> 1)) & 3).astype(np.int8)
 
 
 class DragonCurve(Fractal):
     """
     The Dragon Curve - a self-similar fractal that looks like a dragon
     viewed from above. Created by folding a strip of paper in half repeatedly.
+
+    Level ``n`` is the first ``2**n`` edges of one infinite edge sequence. Each
+    heading comes straight from its index (see ``dragon_headings``), so any
+    level or any edge range is built directly in fixed-size chunks, without
+    computing the levels below it.
     """
 
-    def __init__(self, init_length):
-        self.turns = []  # Will store turn directions: 1 = left, -1 = right
+    random_access = True
+
+    def __init__(self, init_length, chunk_size=1 << 20):
+        self.chunk_size = chunk_size
         super().__init__(
             init_length=init_length,
             init_angle=0,
             fractal_update_func=self.dragon_update,
-            init_edges=[{'length': init_length, 'angle': 0}]
+            init_edges=EdgeArray([init_length], [0])
         )
 
-    def dragon_update(self, edges: list[dict]) -> list[dict]:
-        # Dragon curve rule: take existing turns, add a left turn,
-        # then add the reverse of existing turns with flipped directions
-        new_turns = self.turns + [1] + [-t for t in reversed(self.turns)]
-        self.turns = new_turns
+    def edge_count(self, level) -> int:
+        return 2 ** level
+
+    def edge_range(self, level, start, stop) -> EdgeArray:
+        """Edges ``start`` to ``stop - 1``. These are the same at every level with ``2**level >= stop``."""
+        angles = np.empty(stop - start, dtype=np.float64)
+
+        for chunk_start in range(start, stop, self.chunk_size):
+            chunk_stop = min(chunk_start + self.chunk_size, stop)
+            indices = np.arange(chunk_start, chunk_stop, dtype=np.int64)
+            angles[chunk_start - start:chunk_stop - start] = dragon_headings(indices) * 90.0
+
+        return EdgeArray(np.full(len(angles), self.init_length, dtype=np.float64), angles)
+
+    def bounds(self, level, start_pos=(0, 0)):
+        """
+        Bounding box of ``level`` in O(level) work.
 
-        # Convert turns to edges
-        new_edges = []
-        current_angle = 0
-        for turn in new_turns:
-            new_edges.append({'length': self.init_length, 'angle': current_angle})
-            current_angle += turn * 90
+        Level ``n + 1`` is level ``n`` followed by the reverse of level ``n``
+        turned a quarter left, so the reverse of level ``n + 1`` is level ``n``
+        turned a quarter left followed by the reverse of level ``n``. Joining
+        the extents of both sequences at each of the four rotations follows
+        that recursion up from a single edge.
+        """
+        forward = backward = [_edge_extent(self.init_length, 90 * quarter) for quarter in range(4)]
 
-        # Add final edge
-        new_edges.append({'length': self.init_length, 'angle': current_angle})
+        for _ in range(level):
+            forward, backward = (
+                [_join_extents([forward[r], backward[(r + 1) % 4]]) for r in range(4)],
+                [_join_extents([forward[(r + 1) % 4], backward[r]]) for r in range(4)],
+            )
+
+        return _extent_bounds(forward[0], start_pos)
+
+    def dragon_update(self, edges: EdgeArray) -> EdgeArray:
+        # Level n + 1 is level n followed by its mirrored reverse. The closed form
+        # gives that directly, so the previous edges are not needed.
+        level = self.current_recursion_level + 1
+        return self.edge_range(level, 0, 2 ** level)
+
+    def generate(self, desired_recursion_level):
+        edges = self.level_cache.get(desired_recursion_level)
+
+        if edges is None:
+            # Jump straight to the requested level instead of building every level below it
+            n = 2 ** desired_recursion_level
+            with instrument.stage('generate', edges=n, fractal=type(self).__name__, level=desired_recursion_level):
+                edges = self.edge_range(desired_recursion_level, 0, n)
+            self.level_cache.put(desired_recursion_level, edges)
 
-        return new_edges
+        return edges
 
 
-class LevyCCurve(Fractal):
+class LevyCCurve(SubstitutionFractal):
     """
     The Levy C Curve (or Levy Dragon) - a self-similar fractal that creates
     beautiful symmetric tree-like patterns from a single line.
     """
 
-    def __init__(self, init_length):
-        super().__init__(
-            init_length=init_length,
-            init_angle=0,
-            fractal_update_func=self.levy_update,
-            init_edges=[{'length': init_length, 'angle': 0}]
-        )
-
-    def levy_update(self, edges: list[dict]) -> list[dict]:
-        new_edges = []
-        scale = 1 / np.sqrt(2)  # Each segment shrinks by sqrt(2)
-
-        for edge in edges:
-            # Each edge becomes two edges at 45-degree angles
-            new_length = edge['length'] * scale
-            new_edges.append({'length': new_length, 'angle': edge['angle'] + 45})
-            new_edges.append({'length': new_length, 'angle': edge['angle'] - 45})
+    # Each edge becomes two edges at 45-degree angles, shrunk by sqrt(2)
+    offsets = (45, -45)
+    scale = 1 / np.sqrt(2)
 
-        return new_edges
+    def __init__(self, init_length):
+        super().__init__(init_length=init_length, init_angle=0)
 
 
-class SierpinskiArrowhead(Fractal):
+class SierpinskiArrowhead(SubstitutionFractal):
     """
     The Sierpinski Arrowhead Curve - draws the Sierpinski triangle
     as a single continuous line using 60-degree angles.
     """
 
+    # Pattern: turn left 60, forward, turn right 60, forward, turn left 60
+    offsets = (60, 0, -60)
+    scale = 1 / 2
+
     def __init__(self, init_length):
-        self.iteration = 0
+        super().__init__(init_length=init_length, init_angle=0)
+
+    def offsets_for_level(self, level):
+        # Alternate the pattern based on level
+        flip = 1 if level % 2 == 1 else -1
+        return tuple(flip * offset for offset in self.offsets)
+
+
+class LSystemFractal(Fractal):
+    """
+    Fractal defined declaratively by an L-system.
+
+    The rules are compiled once into lookup tables (see ``LSystem``). Each
+    level is one vectorized rewrite, and the turtle is vectorized too: symbols
+    become turn deltas, then a cumulative heading, then coordinates via
+    ``compute_coordinates``.
+
+    Example:
+        LSystemFractal(axiom='F', rules={'F': 'F+F-F-F+F'}, angle=90, draw_symbols='F')
+    """
+
+    def __init__(self, axiom: str, rules: dict[str, str], angle: float, draw_symbols: str,
+                 init_length=10, init_angle=0):
+
+        self.axiom = axiom
+        self.lsystem = LSystem(rules=rules, angle=angle, draw_symbols=draw_symbols)
+        self.state = self.lsystem.encode(axiom)
+
         super().__init__(
             init_length=init_length,
-            init_angle=0,
-            fractal_update_func=self.sierpinski_update,
-            init_edges=[{'length': init_length, 'angle': 0}]
+            init_angle=init_angle,
+            fractal_update_func=self.lsystem_update,
+            init_edges=self.lsystem.to_edges(self.state, init_length, init_angle=init_angle)
         )
 
     def reset(self):
         super().reset()
-        self.iteration = 0
+        self.state = self.lsystem.encode(self.axiom)
+
+    def lsystem_update(self, edges: EdgeArray) -> EdgeArray:
+        # Apply L-system rewriting rules
+        self.state = self.lsystem.expand(self.state)
+        return self.lsystem.to_edges(self.state, self.init_length, init_angle=self.init_angle)
+
+    def generate(self, desired_recursion_level):
+        # The level cache holds symbol states. Only those are needed for the
+        # intermediate levels; the turtle runs once at the end.
+        level = self.level_cache.deepest(desired_recursion_level)
+        if level is None:
+            level, state = 0, self.lsystem.encode(self.axiom)
+        else:
+            state = self.level_cache.get(level)
+
+        with instrument.stage('generate', total=desired_recursion_level - level, unit='levels',
+                              fractal=type(self).__name__, level=desired_recursion_level) as stage:
+            while level < desired_recursion_level:
+                state = self.lsystem.expand(state)
+                level += 1
+                self.level_cache.put(level, state)
+                stage.advance()
+
+            edges = self.lsystem.to_edges(state, self.init_length, init_angle=self.init_angle)
+            stage.edges = len(edges)
 
-    def sierpinski_update(self, edges: list[dict]) -> list[dict]:
-        new_edges = []
-        # Alternate the pattern based on iteration
-        self.iteration += 1
-        flip = 1 if self.iteration % 2 == 1 else -1
+        return edges
+
+    def cache_params(self) -> dict:
+        params = super().cache_params()
+        params.update(
+            axiom=self.axiom,
+            rules=self.lsystem.rules,
+            angle=self.lsystem.angle,
+            draw_symbols=self.lsystem.draw_symbols,
+        )
+        return params
 
-        for edge in edges:
-            new_length = edge['length'] / 2
-            base_angle = edge['angle']
+    def edge_count(self, level) -> int:
+        return self.lsystem.count_draws(self.lsystem.encode(self.axiom), level)
 
-            # Pattern: turn left 60, forward, turn right 60, forward, turn left 60
-            new_edges.append({'length': new_length, 'angle': base_angle + flip * 60})
-            new_edges.append({'length': new_length, 'angle': base_angle})
-            new_edges.append({'length': new_length, 'angle': base_angle - flip * 60})
+    def bounds(self, level, start_pos=(0, 0)):
+        extent = self.lsystem.extent(self.lsystem.encode(self.axiom), level, self.init_length, self.init_angle)
+        if extent is None:
+            return None
 
-        return new_edges
+        return _extent_bounds(extent, start_pos)
 
+    def _iter_edge_pieces(self, level, chunk_size):
+        block_size = max(1, chunk_size // int(self.lsystem.rule_lengths.max()))
+        heading = self.init_angle
 
-class MooreCurve(Fractal):
+        for state in self.lsystem.iter_expanded(self.lsystem.encode(self.axiom), level, block_size):
+            # Carry the turtle heading from one piece to the next
+            yield self.lsystem.to_edges(state, self.init_length, init_angle=heading)
+            heading += self.lsystem.turn_deltas[state].sum()
+
+
+class MooreCurve(LSystemFractal):
     """
     The Moore Curve - a variant of the Hilbert curve that forms a closed loop.
     It's a space-filling curve that returns to its starting point.
@@ -326,100 +1176,33 @@ class MooreCurve(Fractal):
     """
 
     def __init__(self, init_length):
-        self.rules = {
-            'L': '-RF+LFL+FR-',
-            'R': '+LF-RFR-FL+'
-        }
-        # Start with the Moore curve axiom
-        self.state = 'LFL+F+LFL'
         super().__init__(
+            axiom='LFL+F+LFL',
+            rules={
+                'L': '-RF+LFL+FR-',
+                'R': '+LF-RFR-FL+'
+            },
+            angle=90,
+            draw_symbols='F',  # L and R are just markers for rewriting, not drawing
             init_length=init_length,
-            init_angle=0,
-            fractal_update_func=self.moore_update,
-            init_edges=self._state_to_edges(init_length, 'LFL+F+LFL')
+            init_angle=90,  # Start facing up
         )
 
-    def reset(self):
-        super().reset()
-        self.state = 'LFL+F+LFL'
-
-    def _state_to_edges(self, length, state):
-        """Convert L-system state string to edge list."""
-        edges = []
-        current_angle = 90  # Start facing up
-
-        for char in state:
-            if char == 'F':
-                edges.append({'length': length, 'angle': current_angle})
-            elif char == '+':
-                current_angle += 90
-            elif char == '-':
-                current_angle -= 90
-            # L and R are just markers for rewriting, not drawing
-
-        return edges
-
-    def moore_update(self, edges: list[dict]) -> list[dict]:
-        # Apply L-system rewriting rules
-        new_state = ''
-        for char in self.state:
-            if char in self.rules:
-                new_state += self.rules[char]
-            else:
-                new_state += char
-
-        self.state = new_state
-        return self._state_to_edges(self.init_length, self.state)
-
 
-class GosperCurve(Fractal):
+class GosperCurve(LSystemFractal):
     """
     The Gosper Curve (Flowsnake) - a space-filling curve with hexagonal
     symmetry, using 60-degree angles for an organic, flowing appearance.
     """
 
     def __init__(self, init_length):
-        # L-system: A -> A-B--B+A++AA+B-
-        #           B -> +A-BB--B-A++A+B
-        self.state = 'A'
         super().__init__(
+            axiom='A',
+            rules={
+                'A': 'A-B--B+A++AA+B-',
+                'B': '+A-BB--B-A++A+B'
+            },
+            angle=60,
+            draw_symbols='AB',  # Both A and B mean forward
             init_length=init_length,
-            init_angle=0,
-            fractal_update_func=self.gosper_update,
-            init_edges=[{'length': init_length, 'angle': 0}]
         )
-
-    def reset(self):
-        super().reset()
-        self.state = 'A'
-
-    def _state_to_edges(self, length, state):
-        """Convert L-system state string to edge list."""
-        edges = []
-        current_angle = 0
-
-        for char in state:
-            if char in ('A', 'B'):  # Both A and B mean forward
-                edges.append({'length': length, 'angle': current_angle})
-            elif char == '+':
-                current_angle += 60
-            elif char == '-':
-                current_angle -= 60
-
-        return edges
-
-    def gosper_update(self, edges: list[dict]) -> list[dict]:
-        rules = {
-            'A': 'A-B--B+A++AA+B-',
-            'B': '+A-BB--B-A++A+B'
-        }
-
-        new_state = ''
-        for char in self.state:
-            if char in rules:
-                new_state += rules[char]
-            else:
-                new_state += char
-
-        self.state = new_state
-        return self._state_to_edges(self.init_length, self.state)
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+import instrument
+
+
+# Bump when a change to the generators alters the geometry they produce
+CACHE_VERSION = 2
+
+
+def cache_key(fractal, level, start_pos=(0, 0)):
+    """
+    Content address of a fractal's vertex array: a hash of the fractal class,
+    its ``cache_params()``, the level and the start position.
+
+    Returns ``(key, description)``, where ``description`` is the JSON that was hashed.
+    """
+    description = json.dumps(
+        {
+            'version': CACHE_VERSION,
+            'class': f'{type(fractal).__module__}.{type(fractal).__qualname__}',
+            'params': fractal.cache_params(),
+            'level': level,
+            'start_pos': [float(start_pos[0]), float(start_pos[1])],
+        },
+        sort_keys=True,
+        default=str,
+    )
+    key = hashlib.sha256(description.encode()).hexdigest()[:32]
+
+    return key, description
+
+
+def cached_coordinates(fractal, level, start_pos=(0, 0), cache_dir='geometry_cache', chunk_size=1 << 20):
+    """
+    Return the (n + 1, 2) vertex array of ``fractal`` at ``level``, memory-mapped
+    read-only from ``cache_dir``.
+
+    On a miss, the vertices are streamed with ``fractal.iter_coordinates`` into
+    a new ``.npy`` file, ``chunk_size`` edges at a time, so generation never
+    holds the whole level in memory. The file is written under a temporary
+    name and renamed into place, so concurrent renders never see a partial
+    file. Every process that maps the same entry shares one copy in the OS
+    page cache.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    key, description = cache_key(fractal, level, start_pos)
+    path = cache_dir / f'{key}.npy'
+
+    if path.exists():
+        instrument.event('geometry_cache_hit', file=path.name)
+        return np.load(path, mmap_mode='r')
+
+    n = fractal.edge_count(level)
+
+    tmp_path = cache_dir / f'{key}.{os.getpid()}.tmp.npy'
+    coords = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64, shape=(n + 1, 2))
+
+    with instrument.stage('cache_coordinates', edges=n, file=path.name) as stage:
+        offset = 0
+        for chunk in fractal.iter_coordinates(level, chunk_size, start_pos=start_pos):
+            m = len(chunk) - 1
+            coords[offset:offset + m + 1] = chunk
+            offset += m
+            stage.advance(m)
+
+        coords.flush()
+        del coords
+
+    # Human-readable record of what the key stands for
+    (cache_dir / f'{key}.json').write_text(description)
+    os.replace(tmp_path, path)
+
+    return np.load(path, mmap_mode='r')
+
+
+def clear_cache(cache_dir='geometry_cache'):
+    """Delete every cached vertex array in ``cache_dir``."""
+    cache_dir = Path(cache_dir)
+    if not cache_dir.exists():
+        return
+
+    for path in list(cache_dir.glob('*.npy')) + list(cache_dir.glob('*.json')):
+        path.unlink()
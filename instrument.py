@@ -0,0 +1,361 @@
+"""
+Per-stage timing and memory instrumentation for the rendering pipeline.
+
+Pipeline code wraps each stage in ``stage``:
+
+    with instrument.stage('generate', level=12) as s:
+        edges = ...
+        s.edges = len(edges)
+
+and reports one-off facts with ``event``. Both go to every installed sink
+(``add_sink``, or ``recording`` for a block). A finished stage becomes a
+record like
+
+    {'kind': 'stage', 'stage': 'generate', 'seconds': 0.41, 'edges': 262144,
+     'edges_per_second': 639375.6, 'level': 12, 'depth': 0, 'thread': 'MainThread'}
+
+plus ``bytes_allocated`` and ``peak_bytes`` while ``track_memory`` is on.
+
+With no sinks installed, ``stage`` returns a shared do-nothing object
+without reading the clock, so instrumented code costs a function call and
+an attribute check.
+"""
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+# Installed sinks. Replaced, never mutated, so emitting needs no lock.
+_sinks = ()
+_memory = False
+_local = threading.local()
+
+
+class Sink:
+    """Base class of instrumentation sinks. Every hook is optional."""
+
+    def start(self, stage):
+        """Called when ``stage`` (a ``Stage``) is entered."""
+
+    def advance(self, stage, count):
+        """Called when ``stage`` reports ``count`` more units of progress."""
+
+    def finish(self, stage, record):
+        """Called when ``stage`` exits, with its record."""
+
+    def event(self, record):
+        """Called with the record of an ``event``."""
+
+    def close(self):
+        """Release the sink's resources, e.g. its file."""
+
+
+class Stage:
+    """
+    A running pipeline stage, returned by ``stage``. Set ``edges`` once the
+    edge count is known and call ``advance`` as work completes, so progress
+    sinks can follow along. ``total`` and ``unit`` describe that progress.
+    """
+
+    def __init__(self, name, edges=None, total=None, unit='edges', **fields):
+
+        self.name = name
+        self.edges = edges
+        self.total = total if total is not None else edges
+        self.unit = unit
+        self.fields = fields
+        self.done = 0
+
+    def advance(self, count=1):
+
+        self.done += count
+        for sink in _sinks:
+            sink.advance(self, count)
+
+    def __enter__(self):
+
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.depth = len(stack)
+
+        if _memory and tracemalloc.is_tracing():
+            # Fold the peak so far into the open stages before restarting it for this one
+            current, peak = tracemalloc.get_traced_memory()
+            for outer in stack:
+                outer.peak = max(outer.peak, peak)
+            tracemalloc.reset_peak()
+            self.memory_start = self.peak = current
+        else:
+            self.memory_start = None
+
+        stack.append(self)
+        for sink in _sinks:
+            sink.start(self)
+
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+
+        seconds = time.perf_counter() - self.start_time
+        _local.stack.pop()
+
+        record = {'kind': 'stage', 'stage': self.name, 'seconds': seconds}
+        if self.edges is not None:
+            record['edges'] = self.edges
+            record['edges_per_second'] = self.edges / seconds if seconds > 0 else None
+
+        if self.memory_start is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            record['bytes_allocated'] = current - self.memory_start
+            record['peak_bytes'] = self.peak - self.memory_start
+            if _local.stack:
+                _local.stack[-1].peak = max(_local.stack[-1].peak, self.peak)
+
+        record.update(self.fields)
+        record['depth'] = self.depth
+        record['thread'] = threading.current_thread().name
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+
+        for sink in _sinks:
+            sink.finish(self, record)
+
+        return False
+
+
+class _NullStage:
+    """What ``stage`` returns while instrumentation is off: accepts everything, does nothing."""
+
+    edges = total = None
+    done = 0
+
+    def advance(self, count=1):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, edges=None, total=None, unit='edges', **fields):
+    """
+    Context manager timing the pipeline stage ``name``. ``edges`` (settable
+    later on the returned object) gives the edges-per-second rate. ``total``
+    (default: ``edges``) is the amount of work, in ``unit``, that progress
+    sinks count ``advance`` calls against. Extra keyword ``fields`` are copied
+    into the record.
+    """
+    if not _sinks:
+        return _NULL_STAGE
+
+    return Stage(name, edges, total, unit, **fields)
+
+
+def event(name, **fields):
+    """Report a one-off fact about the run, such as the encoder chosen."""
+    if not _sinks:
+        return
+
+    record = {'kind': 'event', 'event': name, **fields, 'thread': threading.current_thread().name}
+    for sink in _sinks:
+        sink.event(record)
+
+
+def enabled():
+    """Whether any sink is installed."""
+    return bool(_sinks)
+
+
+def add_sink(sink):
+
+    global _sinks
+    _sinks = _sinks + (sink,)
+    return sink
+
+
+def remove_sink(sink):
+
+    global _sinks
+    _sinks = tuple(s for s in _sinks if s is not sink)
+
+
+def track_memory(enable=True):
+    """
+    Record ``bytes_allocated`` (net) and ``peak_bytes`` (above the level at
+    entry) for every stage, using ``tracemalloc``, which also sees NumPy
+    buffers. Tracing slows allocation-heavy Python code, so it is off by default.
+    """
+    global _memory
+    _memory = enable
+
+    if enable and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enable and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+@contextmanager
+def recording(*sinks, memory=False):
+    """Install ``sinks`` (and memory tracking) for the duration of a ``with`` block, then close them."""
+    for sink in sinks:
+        add_sink(sink)
+    if memory:
+        track_memory(True)
+
+    try:
+        yield sinks
+    finally:
+        if memory:
+            track_memory(False)
+        for sink in sinks:
+            remove_sink(sink)
+            sink.close()
+
+
+def format_record(record):
+    """One-line human-readable summary of a stage or event record."""
+    if record['kind'] == 'event':
+        details = ', '.join(f'{key}={value}' for key, value in record.items() if key not in ('kind', 'event', 'thread'))
+        return f"{record['event']}: {details}" if details else record['event']
+
+    parts = [f"{record['seconds']:.3f}s"]
+    if 'edges' in record:
+        parts.append(f"{record['edges']} edges")
+        if record['edges_per_second']:
+            parts.append(f"{record['edges_per_second']:,.0f} edges/s")
+    if 'peak_bytes' in record:
+        parts.append(f"peak {record['peak_bytes'] / 2 ** 20:.1f} MiB")
+
+    return f"{'  ' * record['depth']}{record['stage']}: {', '.join(parts)}"
+
+
+class LoggingSink(Sink):
+    """Log every finished stage and event as one line to ``logger`` (default: this module's logger)."""
+
+    def __init__(self, logger=None, level=logging.INFO):
+
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def finish(self, stage, record):
+        self.logger.log(self.level, format_record(record))
+
+    def event(self, record):
+        self.logger.log(self.level, format_record(record))
+
+
+class JSONLinesSink(Sink):
+    """Append every finished stage and event as a JSON object per line to ``output`` (a path or text file)."""
+
+    def __init__(self, output):
+
+        if isinstance(output, str):
+            self._file = open(output, 'a')
+            self._owned = True
+        else:
+            self._file = output
+            self._owned = False
+
+        self._lock = threading.Lock()
+
+    def _write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def finish(self, stage, record):
+        self._write(record)
+
+    def event(self, record):
+        self._write(record)
+
+    def close(self):
+        if self._owned:
+            self._file.close()
+
+
+class ProgressBarSink(Sink):
+    """
+    A ``tqdm`` progress bar for every running stage that reports progress
+    with ``advance``, out of its ``total``. Finished stages and events are
+    printed above the bars.
+    """
+
+    def __init__(self, min_total=1, file=None):
+        from tqdm.auto import tqdm
+
+        self._tqdm = tqdm
+        self.min_total = min_total
+        self.file = file or sys.stderr
+        self._bars = {}
+        self._lock = threading.Lock()
+
+    def advance(self, stage, count):
+
+        bar = self._bars.get(id(stage))
+        if bar is None:
+            # Only stages that report progress get a bar, and only once they start reporting
+            if stage.total is None or stage.total < self.min_total:
+                return
+            with self._lock:
+                bar = self._bars[id(stage)] = self._tqdm(total=stage.total, desc=stage.name, unit=stage.unit,
+                                                         leave=False, file=self.file)
+            bar.update(stage.done - count)
+
+        bar.update(count)
+
+    def finish(self, stage, record):
+
+        with self._lock:
+            bar = self._bars.pop(id(stage), None)
+        if bar is not None:
+            bar.close()
+
+        self._tqdm.write(format_record(record), file=self.file)
+
+    def event(self, record):
+        self._tqdm.write(format_record(record), file=self.file)
+
+    def close(self):
+
+        with self._lock:
+            for bar in self._bars.values():
+                bar.close()
+            self._bars.clear()
+
+
+class CollectingSink(Sink):
+    """Keep every finished stage and event record in ``records``, e.g. for a benchmark or a test."""
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def finish(self, stage, record):
+        with self._lock:
+            self.records.append(record)
+
+    def event(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def stages(self, name=None):
+        """Finished stage records, optionally only those of stage ``name``."""
+        return [record for record in self.records
+                if record['kind'] == 'stage' and (name is None or record['stage'] == name)]
@@ -1,15 +1,15 @@
 import turtle as t
 import numpy as np
 
+import instrument
+
 # Draw the curve function
 def draw_fractal(fractal, init_pos, desired_recursion_level, speed=0, cmap=None):
     
     t.TurtleScreen._RUNNING = True
 
-    print('--Making Fractal--')
     fractal_lines = fractal.generate(desired_recursion_level=desired_recursion_level)
 
-    print('--Drawing--')
     screen = t.Screen()
     screen.colormode(1)
 
@@ -18,19 +18,19 @@ def draw_fractal(fractal, init_pos, desired_recursion_level, speed=0, cmap=None)
     t.pendown()
     t.speed(speed)
 
-    for i, edge in enumerate(fractal_lines):
-
-        if cmap is not None:
-            
-            color = cmap(i/len(fractal_lines))
-            r, g, b = color[0], color[1], color[2]
-            
-            t.pencolor(r, g, b)
+    with instrument.stage('draw', edges=len(fractal_lines)) as stage:
+        for i, edge in enumerate(fractal_lines):
 
-        t.setheading(0)
-        t.left(edge['angle'])
-        t.forward(edge['length'])
+            if cmap is not None:
+                
+                color = cmap(i/len(fractal_lines))
+                r, g, b = color[0], color[1], color[2]
+                
+                t.pencolor(r, g, b)
 
-    print('--Finshed drawing--')
+            t.setheading(0)
+            t.left(edge['angle'])
+            t.forward(edge['length'])
+            stage.advance()
 
     screen.exitonclick()
\ No newline at end of file
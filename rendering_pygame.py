@@ -1,16 +1,35 @@
+import itertools
+import queue
+import sys
+import threading
+from collections import OrderedDict, deque
+
 import pygame
 import numpy as np
 
+import instrument
+from spatial import SegmentGrid
+from video import BackgroundVideoWriter, FFmpegVideoWriter, concat_videos, open_video_writer, resolve_backend
+
 
 def draw_fractal(fractal, init_pos, desired_recursion_level,
                  window_size=(800, 800), line_width=1,
                  edges_per_frame=None, duration=None, cmap=None, fps=60,
-                 background_color=(0, 0, 0), line_color=None, auto_scale=True, padding=50):
+                 background_color=(0, 0, 0), line_color=None, auto_scale=True, padding=50, lod_threshold=1.0,
+                 chunk_size=None, coordinate_dtype=np.float64):
     """
     Render fractal using Pygame with animated progressive drawing.
 
+    The window opens straight away. The fractal is generated on a background
+    thread (see ``CoordinateStream``) and drawn chunk by chunk as it arrives,
+    so the window stays responsive. Closing it or pressing Escape cancels
+    generation. The fit comes from ``fractal.bounds`` up front, so nothing
+    drawn ever has to be redrawn at a new scale. The edge count and the fit
+    are worked out on that thread too, since without closed forms they take
+    a pass over the level.
+
     Args:
-        fractal: Fractal object with generate() and compute_coordinates() methods
+        fractal: Fractal object (streamed with its iter_coordinates() method)
         init_pos: Starting position (used if auto_scale=False)
         desired_recursion_level: Recursion depth for fractal generation
         window_size: (width, height) tuple for the window
@@ -22,194 +41,586 @@ def draw_fractal(fractal, init_pos, desired_recursion_level,
         background_color: RGB tuple for background
         auto_scale: If True, automatically scale and center the fractal to fit window
         padding: Padding from window edges when auto_scale=True
+        lod_threshold: Level-of-detail cell size in pixels (see decimate_segments)
+        chunk_size: Edges generated per chunk on the background thread (default 65536)
+        coordinate_dtype: dtype of the vertices (see Fractal.compute_coordinates)
     """
-    print('--Making Fractal--')
-    edges = fractal.generate(desired_recursion_level=desired_recursion_level)
-
-    print('--Computing Coordinates--')
-    coords = fractal.compute_coordinates(edges, start_pos=init_pos)
-    n = len(coords) - 1
-
-    # Calculate edges_per_frame from duration if specified
-    if edges_per_frame is not None:
-        # Explicit edges_per_frame takes priority
-        pass
-    elif duration is not None and duration > 0:
-        # Calculate edges_per_frame to achieve target duration
-        total_frames = int(duration * fps)
-        edges_per_frame = max(1, n // total_frames)
-        print(f'--Target duration: {duration}s ({edges_per_frame} edges/frame)--')
-    else:
-        # Default: draw as fast as possible (all edges per frame)
-        edges_per_frame = n
-
-    # Auto-scale to fit window
-    if auto_scale:
-        coords = scale_to_window(coords, window_size, padding)
-    else:
-        # Just flip y-axis for screen coordinates (y increases downward)
-        coords = coords.copy()
-        coords[:, 1] = window_size[1] - coords[:, 1]
-
-    # Pre-compute colors
-    if line_color is not None:
-        colors = [line_color] * n
-    elif cmap is not None:
-        colors = [tuple(int(c * 255) for c in cmap(i / n)[:3]) for i in range(n)]
-    else:
-        colors = [(255, 255, 255)] * n
-
-    # Initialize Pygame
+    # Open the window first; the fractal is generated in the background and drawn as it arrives
     pygame.init()
     screen = pygame.display.set_mode(window_size)
-    pygame.display.set_caption(f'Fractal - Level {desired_recursion_level} ({n} edges)')
-    clock = pygame.time.Clock()
-
-    # View transform state
-    zoom = 1.0
-    pan_offset = [0.0, 0.0]
-    dragging = False
-    last_mouse_pos = None
-    window_center = (window_size[0] / 2, window_size[1] / 2)
-
-    # Cached surface for fast pan/zoom (rendered at 1x scale)
-    # We use a larger surface to allow some zoom without quality loss
-    cache_scale = 2.0  # Render at 2x resolution for better zoom quality
-    cache_size = (int(window_size[0] * cache_scale), int(window_size[1] * cache_scale))
-    fractal_cache = pygame.Surface(cache_size)
-    fractal_cache.fill(background_color)
-    cache_valid = False
-
-    def render_to_cache():
-        """Render the full fractal to the cache surface at high resolution."""
-        nonlocal cache_valid
-        fractal_cache.fill(background_color)
-        # Scale coordinates to cache size
-        scale_factor = cache_scale
-        for i in range(n):
-            start = (int(coords[i][0] * scale_factor), int(coords[i][1] * scale_factor))
-            end = (int(coords[i + 1][0] * scale_factor), int(coords[i + 1][1] * scale_factor))
-            pygame.draw.line(fractal_cache, colors[i], start, end, max(1, int(line_width * scale_factor)))
-        cache_valid = True
-
-    def blit_cached_view():
-        """Blit the cached surface to screen with current zoom and pan."""
-        screen.fill(background_color)
-
-        # The cached surface is at cache_scale resolution
-        # At zoom=1.0, we want it to display at window_size
-        scaled_size = (int(window_size[0] * zoom), int(window_size[1] * zoom))
-
-        # Scale the cached surface
-        if scaled_size[0] > 0 and scaled_size[1] > 0:
-            scaled_surface = pygame.transform.smoothscale(fractal_cache, scaled_size)
-
-            # Position: pan_offset is the top-left corner offset from centered position
-            pos_x = int(pan_offset[0])
-            pos_y = int(pan_offset[1])
-
-            screen.blit(scaled_surface, (pos_x, pos_y))
-
-        pygame.display.flip()
-
-    def update_caption():
-        """Update window title with zoom level."""
-        zoom_str = f'{zoom:.1f}x' if zoom != 1.0 else ''
-        if zoom_str:
-            pygame.display.set_caption(f'Fractal - Level {desired_recursion_level} ({n} edges) - Zoom: {zoom_str}')
-        else:
-            pygame.display.set_caption(f'Fractal - Level {desired_recursion_level} ({n} edges)')
-
-    # Fill background
     screen.fill(background_color)
+    pygame.display.flip()
+    clock = pygame.time.Clock()
 
-    print(f'--Drawing {n} edges--')
+    stream = CoordinateStream(fractal, desired_recursion_level, init_pos, chunk_size or 1 << 16, fit=auto_scale)
+    pygame.display.set_caption(f'Fractal - Level {desired_recursion_level} - Measuring')
 
-    # Progressive drawing loop
+    # The progressive drawing stage, and the multi-resolution tile cache for pan/zoom with the background
+    # thread that builds it once drawing completes
+    drawing = pyramid = indexer = None
     drawn_edges = 0
-    running = True
-    current_edges_per_frame = edges_per_frame
-    needs_redraw = False
-
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
+
+    try:
+        # Without closed forms, counting the edges and fitting the window take passes over the level
+        while not stream.wait_ready(1 / fps):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    return
+
+        n = stream.total
+        pygame.display.set_caption(f'Fractal - Level {desired_recursion_level} ({n} edges)')
+
+        # Calculate edges_per_frame from duration if specified
+        if edges_per_frame is not None:
+            # Explicit edges_per_frame takes priority
+            pass
+        elif duration is not None and duration > 0:
+            # Calculate edges_per_frame to achieve target duration
+            total_frames = int(duration * fps)
+            edges_per_frame = max(1, n // total_frames)
+            instrument.event('edges_per_frame', edges_per_frame=edges_per_frame, duration=duration)
+        else:
+            # Default: draw as fast as possible (all edges per frame)
+            edges_per_frame = n
+
+        lut = color_lut(cmap, line_color)
+        colors = None
+
+        # Vertices as generated; the first `received` edges have arrived. Each batch is scaled to the
+        # window when it is drawn.
+        raw = np.empty((n + 1, 2), dtype=coordinate_dtype)
+        coords = None
+        received = 0
+
+        if auto_scale:
+            transform = window_transform(stream.bounds, window_size, padding)
+
+        def to_window(points):
+            """Scale raw vertices into the window, in place."""
+            if auto_scale:
+                return apply_window_transform(points, transform, window_size)
+
+            # Just flip y-axis for screen coordinates (y increases downward)
+            points[:, 1] = window_size[1] - points[:, 1]
+            return points
+
+        def receive_chunks():
+            """Take the chunks that arrived since the last frame."""
+            nonlocal received
+
+            # A bounded intake per frame keeps the loop responsive when generation runs ahead
+            for chunk in stream.poll(max_chunks=8):
+                m = len(chunk) - 1
+                raw[received:received + m + 1] = chunk
+                received += m
+
+        # The progressive drawing is rasterized into this RGB canvas and blitted to the screen each frame
+        canvas = np.empty((window_size[1], window_size[0], 3), dtype=np.uint8)
+        canvas[:] = background_color
+
+        # Edges drawn per frame at most, so a frame never blocks the event loop for long
+        max_frame_edges = 1 << 18
+
+        # View transform state
+        zoom = 1.0
+        pan_offset = [0.0, 0.0]
+        dragging = False
+        last_mouse_pos = None
+        window_center = (window_size[0] / 2, window_size[1] / 2)
+
+        def build_pyramid():
+            nonlocal pyramid, coords, colors
+            with instrument.stage('index', edges=n):
+                # Generation is over, so the raw vertices can be scaled in place
+                coords = to_window(raw)
+                colors = lut_colors(lut, n)
+
+                # About 64 cells across the window, so a tile at any zoom touches only a few cells
+                cell_size = max(4.0, min(window_size) / 64)
+                grid = SegmentGrid(coords, cell_size, origin=coords.min(axis=0), margin=line_width)
+                tiles = TilePyramid(coords, colors, grid, background_color, line_width)
+                # The 1x level is the fallback for every finer level while its tiles render
+                tiles.warm(0, *window_size)
+            pyramid = tiles
+
+        def blit_cached_view():
+            """Draw the view at the current zoom and pan from the tile pyramid. Returns True while tiles are pending."""
+            screen.fill(background_color)
+            pending = pyramid.draw(screen, zoom, pan_offset)
+            pygame.display.flip()
+            return pending
+
+        def update_caption():
+            """Update window title with zoom level, or generation progress while generating."""
+            caption = f'Fractal - Level {desired_recursion_level} ({n} edges)'
+            if received < n:
+                caption += f' - Generating {received / max(n, 1):.0%}'
+            elif zoom != 1.0:
+                caption += f' - Zoom: {zoom:.1f}x'
+            pygame.display.set_caption(caption)
+
+        # Spans the progressive drawing, from the first frame until every edge is on screen
+        drawing = instrument.stage('draw', edges=n, fractal=type(fractal).__name__, level=desired_recursion_level)
+        drawing.__enter__()
+
+        # Progressive drawing loop
+        running = True
+        current_edges_per_frame = edges_per_frame
+        needs_redraw = False
+
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
                     running = False
-                elif event.key == pygame.K_SPACE:
-                    # Space to instantly complete
-                    current_edges_per_frame = n
-                elif event.key == pygame.K_r:
-                    # Reset view
-                    zoom = 1.0
-                    pan_offset = [0.0, 0.0]
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        running = False
+                    elif event.key == pygame.K_SPACE:
+                        # Space to instantly complete
+                        current_edges_per_frame = n
+                    elif event.key == pygame.K_r:
+                        # Reset view
+                        zoom = 1.0
+                        pan_offset = [0.0, 0.0]
+                        needs_redraw = True
+                        update_caption()
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    if event.button == 1:  # Left click
+                        dragging = True
+                        last_mouse_pos = event.pos
+                elif event.type == pygame.MOUSEBUTTONUP:
+                    if event.button == 1:
+                        dragging = False
+                        last_mouse_pos = None
+                elif event.type == pygame.MOUSEMOTION:
+                    if dragging and last_mouse_pos is not None:
+                        dx = event.pos[0] - last_mouse_pos[0]
+                        dy = event.pos[1] - last_mouse_pos[1]
+                        pan_offset[0] += dx
+                        pan_offset[1] += dy
+                        last_mouse_pos = event.pos
+                        needs_redraw = True
+                elif event.type == pygame.MOUSEWHEEL:
+                    # Alternative mousewheel handling for some systems
+                    mouse_x, mouse_y = pygame.mouse.get_pos()
+                    old_zoom = zoom
+                    if event.y > 0:  # Scroll up - zoom in
+                        zoom = min(zoom * 1.1, 50.0)
+                    elif event.y < 0:  # Scroll down - zoom out
+                        zoom = max(zoom * 0.9, 0.1)
+                    # Adjust pan to keep mouse position fixed
+                    zoom_ratio = zoom / old_zoom
+                    pan_offset[0] = mouse_x - (mouse_x - pan_offset[0]) * zoom_ratio
+                    pan_offset[1] = mouse_y - (mouse_y - pan_offset[1]) * zoom_ratio
                     needs_redraw = True
                     update_caption()
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:  # Left click
-                    dragging = True
-                    last_mouse_pos = event.pos
-            elif event.type == pygame.MOUSEBUTTONUP:
-                if event.button == 1:
-                    dragging = False
-                    last_mouse_pos = None
-            elif event.type == pygame.MOUSEMOTION:
-                if dragging and last_mouse_pos is not None:
-                    dx = event.pos[0] - last_mouse_pos[0]
-                    dy = event.pos[1] - last_mouse_pos[1]
-                    pan_offset[0] += dx
-                    pan_offset[1] += dy
-                    last_mouse_pos = event.pos
-                    needs_redraw = True
-            elif event.type == pygame.MOUSEWHEEL:
-                # Alternative mousewheel handling for some systems
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                old_zoom = zoom
-                if event.y > 0:  # Scroll up - zoom in
-                    zoom = min(zoom * 1.1, 50.0)
-                elif event.y < 0:  # Scroll down - zoom out
-                    zoom = max(zoom * 0.9, 0.1)
-                # Adjust pan to keep mouse position fixed
-                zoom_ratio = zoom / old_zoom
-                pan_offset[0] = mouse_x - (mouse_x - pan_offset[0]) * zoom_ratio
-                pan_offset[1] = mouse_y - (mouse_y - pan_offset[1]) * zoom_ratio
-                needs_redraw = True
-                update_caption()
 
-        # Draw batch of edges during initial animation (directly to screen)
-        if drawn_edges < n:
-            end_idx = min(drawn_edges + current_edges_per_frame, n)
-            for i in range(drawn_edges, end_idx):
-                start = (int(coords[i][0]), int(coords[i][1]))
-                end = (int(coords[i + 1][0]), int(coords[i + 1][1]))
-                pygame.draw.line(screen, colors[i], start, end, line_width)
+            # Draw batch of edges during initial animation, as far as generation has got
+            if drawn_edges < n:
+                receive_chunks()
+                update_caption()
 
-            drawn_edges = end_idx
-            pygame.display.flip()
+                end_idx = min(drawn_edges + current_edges_per_frame, drawn_edges + max_frame_edges, received)
+                if end_idx > drawn_edges:
+                    draw_segments(canvas, to_window(raw[drawn_edges:end_idx + 1].copy()),
+                                  lut_colors(lut, n, drawn_edges, end_idx), line_width, lod_threshold=lod_threshold)
+
+                    drawing.advance(end_idx - drawn_edges)
+                    drawn_edges = end_idx
+                    pygame.surfarray.blit_array(screen, canvas.swapaxes(0, 1))
+                    pygame.display.flip()
+
+                # When animation completes, index it for smooth pan/zoom (in the background; navigation
+                # starts once it is ready)
+                if drawn_edges >= n:
+                    drawing.__exit__(None, None, None)
+                    drawing = None
+                    indexer = threading.Thread(target=build_pyramid, name='tile-pyramid', daemon=True)
+                    indexer.start()
+            elif needs_redraw and pyramid is not None:
+                # Keep redrawing while tiles are still being rendered
+                needs_redraw = blit_cached_view()
+
+            clock.tick(fps)
+    finally:
+        # Stops generation early if the window was closed first. A worker still counting the edges or
+        # measuring the bounds is left to finish on its own.
+        stream.cancel(wait=stream.ready)
+        if drawing is not None:
+            drawing.edges = drawn_edges
+            drawing.__exit__(*sys.exc_info())
+        if indexer is not None:
+            indexer.join()
+        if pyramid is not None:
+            pyramid.close()
+
+        pygame.quit()
+
+
+class CoordinateStream:
+    """
+    Generate a fractal's vertices on a background thread.
+
+    The worker runs ``fractal.iter_coordinates`` and queues each chunk as
+    soon as it is ready. ``poll`` hands over whatever has arrived without
+    blocking, so an event loop can draw while the rest is still being
+    generated. ``cancel`` stops the worker at the next chunk boundary.
+    NumPy releases the GIL for most of the work, so the loop keeps running.
+
+    The worker first sets ``total``, the edge count, and with ``fit=True``
+    also ``bounds``, measured with an extra pass when the fractal has no
+    closed form. Both can take a full pass over the level, so they stay None
+    until ``wait_ready`` returns True.
+    """
 
-            # When animation completes, render to cache for smooth pan/zoom
-            if drawn_edges >= n:
-                print('--Caching fractal for smooth navigation--')
-                render_to_cache()
-        elif needs_redraw and cache_valid:
-            blit_cached_view()
-            needs_redraw = False
+    _DONE = object()
+
+    def __init__(self, fractal, level, init_pos=(0, 0), chunk_size=1 << 16, fit=False):
+
+        self.total = None
+        self.bounds = None
+        self.done = False
+
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._cancelled = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._generate, args=(fractal, level, init_pos, chunk_size, fit),
+                                        name='fractal-generator', daemon=True)
+        self._thread.start()
+
+    def _generate(self, fractal, level, init_pos, chunk_size, fit):
+        try:
+            self.total = fractal.edge_count(level)
+            if fit:
+                self.bounds = fractal.bounds(level, start_pos=init_pos)
+                if self.bounds is None:
+                    self.bounds = fractal.measure_bounds(level, start_pos=init_pos, cancelled=self._cancelled)
+            if self._cancelled.is_set():
+                return
+            self._ready.set()
+
+            with instrument.stage('generate_stream', edges=self.total, level=level) as stage:
+                for coords in fractal.iter_coordinates(level, chunk_size, start_pos=init_pos):
+                    if self._cancelled.is_set():
+                        stage.edges = stage.done
+                        return
+                    self._queue.put(coords)
+                    stage.advance(len(coords) - 1)
+        except Exception as error:
+            self._error = error
+        finally:
+            self._queue.put(self._DONE)
+            self._ready.set()
+
+    def wait_ready(self, timeout=None):
+        """
+        Wait up to ``timeout`` seconds for ``total`` (and ``bounds``). Returns
+        whether they are set. Re-raises a generation error.
+        """
+        if not self._ready.wait(timeout):
+            return False
+
+        if self._error is not None:
+            raise self._error
+
+        return True
+
+    def poll(self, max_chunks=None):
+        """
+        Chunks generated since the last call (at most ``max_chunks``), oldest
+        first. Re-raises a generation error.
+        """
+        chunks = []
+        while not self.done and (max_chunks is None or len(chunks) < max_chunks):
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if item is self._DONE:
+                self.done = True
+                if self._error is not None:
+                    raise self._error
+            else:
+                chunks.append(item)
+
+        return chunks
+
+    @property
+    def ready(self):
+        """Whether ``total`` (and ``bounds``) are set, or the worker has stopped."""
+        return self._ready.is_set()
+
+    def cancel(self, wait=True):
+        """
+        Stop generating. With ``wait``, wait for the worker to finish its
+        current chunk; a worker still counting the edges can't stop until the
+        count is done, so leave it behind with ``wait=False``.
+        """
+        self._cancelled.set()
+        if wait:
+            self._thread.join()
+
+
+class TilePyramid:
+    """
+    Lazily rendered, LRU-evicted pyramid of view tiles for the interactive viewer.
+
+    Level ``L`` renders the window-space polyline at scale ``2 ** L`` into
+    ``tile_size`` square tiles. Each tile at level 0 and finer draws only the
+    segments that the ``SegmentGrid`` files under its area. Coarser tiles
+    are built by shrinking the four tiles of the next finer level, so zooming
+    out never redraws the whole curve. A view at ``zoom`` uses the level with
+    the closest scale at or above the zoom. Its tiles are shrunk by a factor
+    between 0.5 and 1, and the shrunk copies are kept until the zoom changes,
+    so panning only blits finished tiles.
+
+    ``draw`` never renders. It asks a background thread for the tiles the
+    view is missing, newest view first. Until they are ready, they are drawn
+    from the closest cached coarser tile (see ``warm``), and ``draw`` reports
+    that more work is pending. At most ``max_tiles`` tiles are kept; the
+    least recently used are evicted first. ``close`` stops the thread.
+    """
 
-        clock.tick(fps)
+    def __init__(self, coords, colors, grid, background_color, line_width=1, tile_size=256,
+                 min_level=-4, max_level=7, max_tiles=1024):
+
+        self.coords = coords
+        self.colors = colors
+        self.grid = grid
+        self.background_color = background_color
+        self.line_width = line_width
+        self.tile_size = tile_size
+        self.min_level = min_level
+        self.max_level = max_level
+        self.max_tiles = max_tiles
+
+        self._tiles = OrderedDict()
+        self._scaled = {}
+        self._scaled_zoom = None
+
+        # Tiles the current view is missing, for the render thread; guarded by _lock
+        self._lock = threading.Lock()
+        self._wanted = threading.Condition(self._lock)
+        self._requests = []
+        self._closed = False
+        self._renderer = None
+
+    def level_for_zoom(self, zoom):
+        """Pyramid level whose scale is the smallest power of two at or above ``zoom``."""
+        return int(np.clip(np.ceil(np.log2(zoom) - 1e-9), self.min_level, self.max_level))
+
+    def _is_empty(self, level, tx, ty):
+        """Whether tile ``(tx, ty)`` of ``level`` lies outside the indexed area, so it shows only background."""
+        span = self.tile_size / 2.0 ** level
+        margin = self.line_width / 2.0 ** level
+        (x0, y0), size = self.grid.origin, self.grid.cell_size
+        rows, cols = self.grid.shape
+
+        return (tx * span > x0 + cols * size + margin or (tx + 1) * span < x0 - margin or
+                ty * span > y0 + rows * size + margin or (ty + 1) * span < y0 - margin)
+
+    def render_tile(self, level, tx, ty):
+        """Render tile ``(tx, ty)`` of ``level`` to a new surface."""
+        size = self.tile_size
+
+        if self._is_empty(level, tx, ty):
+            surface = pygame.Surface((size, size))
+            surface.fill(self.background_color)
+            return surface
+
+        if level < 0:
+            # Coarser than the window: shrink the four tiles below, instead of drawing every segment again
+            quad = pygame.Surface((2 * size, 2 * size))
+            for dy in (0, 1):
+                for dx in (0, 1):
+                    quad.blit(self.tile(level + 1, 2 * tx + dx, 2 * ty + dy), (dx * size, dy * size))
+            return pygame.transform.smoothscale(quad, (size, size))
+
+        scale = 2.0 ** level
+        origin = np.array([tx * size, ty * size], dtype=np.int64)
+
+        # Window-space area of the tile, grown by the line width in tile pixels
+        x0, y0 = origin / scale
+        margin = self.line_width / scale
+        visible = self.grid.query(x0 - margin, y0 - margin, x0 + (size + margin) / scale, y0 + (size + margin) / scale)
+
+        # Truncate before shifting, like draw_segments, so tiles line up with a full render
+        starts = (self.coords[visible] * scale).astype(np.int64) - origin
+        ends = (self.coords[visible + 1] * scale).astype(np.int64) - origin
+
+        if self.line_width == 1:
+            frame = np.empty((size, size, 3), dtype=np.uint8)
+            frame[:] = self.background_color
+            # Small batches: this runs beside the event loop, and each NumPy call holds the GIL
+            rasterize_lines(frame, starts, ends, self.colors[visible], max_pixels=1 << 16)
+            return pygame.surfarray.make_surface(frame.swapaxes(0, 1))
+
+        surface = pygame.Surface((size, size))
+        surface.fill(self.background_color)
+        for start, end, color in zip(starts.tolist(), ends.tolist(), self.colors[visible].tolist()):
+            pygame.draw.line(surface, color, start, end, self.line_width)
+        return surface
+
+    def tile(self, level, tx, ty, render=True):
+        """Cached tile surface, rendering it when missing (or returning None when ``render`` is False)."""
+        key = (level, tx, ty)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+
+        if not render:
+            return None
+
+        # Rendered outside the lock, so draw() never waits for it
+        surface = self.render_tile(level, tx, ty)
+
+        with self._lock:
+            self._tiles[key] = surface
+            while len(self._tiles) > self.max_tiles:
+                evicted, _ = self._tiles.popitem(last=False)
+                self._scaled.pop(evicted, None)
+
+        return surface
+
+    def warm(self, level, width, height):
+        """Render every tile of ``level`` that covers the window area ``(0, 0)`` to ``(width, height)``."""
+        span = self.tile_size / 2.0 ** level
+        for ty in range(int(np.ceil(height / span))):
+            for tx in range(int(np.ceil(width / span))):
+                self.tile(level, tx, ty)
+
+    def request(self, keys):
+        """Have the render thread render ``keys`` (``(level, tx, ty)``), replacing any earlier request."""
+        with self._lock:
+            self._requests = list(keys)
+            if self._requests:
+                self._wanted.notify()
+
+        if self._renderer is None and keys:
+            self._renderer = threading.Thread(target=self._render_requests, name='tile-renderer', daemon=True)
+            self._renderer.start()
+
+    def _render_requests(self):
+        while True:
+            with self._lock:
+                while not self._requests and not self._closed:
+                    self._wanted.wait()
+                if self._closed:
+                    return
+                key = self._requests.pop(0)
+
+            self.tile(*key)
+
+    def close(self):
+        """Stop the render thread once it finishes its current tile."""
+        with self._lock:
+            self._closed = True
+            self._wanted.notify()
+
+        if self._renderer is not None:
+            self._renderer.join()
+
+    def _fallback(self, level, tx, ty, width, height):
+        """The area of tile ``(level, tx, ty)`` cut from the closest cached coarser tile, scaled to size."""
+        for depth in range(1, level - self.min_level + 1):
+            parent = self.tile(level - depth, tx >> depth, ty >> depth, render=False)
+            if parent is None:
+                continue
+
+            part = self.tile_size >> depth
+            if part == 0:
+                return None
+
+            mask = (1 << depth) - 1
+            area = parent.subsurface(((tx & mask) * part, (ty & mask) * part, part, part))
+            return pygame.transform.scale(area, (width, height))
+
+        return None
+
+    def draw(self, screen, zoom, pan_offset):
+        """
+        Blit the view at ``zoom`` and ``pan_offset`` (screen = window * zoom + pan)
+        onto ``screen``, already filled with the background; tiles with no
+        geometry are skipped. Returns True if some tiles were drawn from a
+        coarser fallback and another ``draw`` will refine them.
+        """
+        level = self.level_for_zoom(zoom)
+        factor = zoom / 2.0 ** level
+        size = self.tile_size
+
+        if zoom != self._scaled_zoom:
+            self._scaled = {}
+            self._scaled_zoom = zoom
+
+        screen_width, screen_height = screen.get_size()
+        pan_x, pan_y = round(pan_offset[0]), round(pan_offset[1])
+
+        # Tiles that overlap the screen
+        tile_span = size * factor
+        tx0, tx1 = int((0 - pan_x) // tile_span), int((screen_width - pan_x) // tile_span)
+        ty0, ty1 = int((0 - pan_y) // tile_span), int((screen_height - pan_y) // tile_span)
+
+        missing = []
+
+        for ty in range(ty0, ty1 + 1):
+            # Edges depend on zoom only, so neighboring tiles meet exactly at any pan
+            top = round(ty * tile_span)
+            height = round((ty + 1) * tile_span) - top
+
+            for tx in range(tx0, tx1 + 1):
+                left = round(tx * tile_span)
+                width = round((tx + 1) * tile_span) - left
+                key = (level, tx, ty)
+                if self._is_empty(level, tx, ty):
+                    continue
+
+                scaled = self._scaled.get(key)
+                if scaled is None:
+                    surface = self.tile(level, tx, ty, render=False)
+
+                    if surface is None:
+                        missing.append(key)
+                        fallback = self._fallback(level, tx, ty, width, height)
+                        if fallback is not None:
+                            screen.blit(fallback, (pan_x + left, pan_y + top))
+                        continue
+
+                    if (width, height) == (size, size):
+                        scaled = surface
+                    else:
+                        scaled = pygame.transform.smoothscale(surface, (width, height))
+                    self._scaled[key] = scaled
+
+                screen.blit(scaled, (pan_x + left, pan_y + top))
+
+        self.request(missing)
+        return bool(missing)
+
+
+def scale_to_window(coords, window_size, padding=50, copy=True, bounds=None):
+    """
+    Scale and center coordinates to fit within window with padding. ``copy=False`` transforms ``coords`` in place.
+    ``bounds`` (e.g. from ``fractal.bounds``) saves the pass over ``coords`` that finds them.
+    """
+    if copy:
+        coords = coords.copy()
 
-    print('--Finished drawing--')
-    pygame.quit()
+    if bounds is None:
+        bounds = (coords.min(axis=0), coords.max(axis=0))
 
+    transform = window_transform(bounds, window_size, padding)
+    return apply_window_transform(coords, transform, window_size)
 
-def scale_to_window(coords, window_size, padding=50):
-    """Scale and center coordinates to fit within window with padding."""
-    coords = coords.copy()
 
-    # Find bounds
-    min_x, min_y = coords.min(axis=0)
-    max_x, max_y = coords.max(axis=0)
+def window_transform(bounds, window_size, padding=50):
+    """
+    Compute the (scale, center_x, center_y) transform that fits ``bounds``,
+    given as ``((min_x, min_y), (max_x, max_y))``, into the window with padding.
+    """
+    (min_x, min_y), (max_x, max_y) = bounds
 
     # Calculate scale to fit in window with padding
     width = max_x - min_x
@@ -224,19 +635,292 @@ def scale_to_window(coords, window_size, padding=50):
     center_x = (min_x + max_x) / 2
     center_y = (min_y + max_y) / 2
 
-    # Transform: center at origin, scale, then translate to window center
-    coords[:, 0] = (coords[:, 0] - center_x) * scale + window_size[0] / 2
-    coords[:, 1] = (coords[:, 1] - center_y) * scale + window_size[1] / 2
+    return scale, center_x, center_y
+
+
+def apply_window_transform(coords, transform, window_size):
+    """Apply a ``window_transform`` to ``coords`` in place and return them."""
+    scale, center_x, center_y = transform
+    x, y = coords[:, 0], coords[:, 1]
+
+    # Transform: center at origin, scale, then translate to window center (in place, no temporaries)
+    x -= center_x
+    x *= scale
+    x += window_size[0] / 2
+    y -= center_y
+    y *= scale
+    y += window_size[1] / 2
 
     # Flip y-axis for screen coordinates
-    coords[:, 1] = window_size[1] - coords[:, 1]
+    np.subtract(window_size[1], y, out=y)
 
     return coords
 
 
+def window_coordinate_chunks(fractal, desired_recursion_level, init_pos, window_size, padding=50, chunk_size=None,
+                             cache_dir=None, dtype=np.float64):
+    """
+    Produce the fractal's vertices, scaled to the window, as a stream of chunks.
+
+    Returns ``(n, chunks)``. ``n`` is the total edge count. ``chunks`` yields
+    ``(offset, coords)`` pairs, where ``coords`` holds the ``m + 1`` vertices of
+    edges ``offset`` to ``offset + m - 1``.
+
+    The window fit comes from ``fractal.bounds``, before any geometry exists.
+    Fractals without one are fit to the vertices in hand instead: the cached
+    or fully generated level. Only streaming them takes an extra measuring
+    pass (``fractal.measure_bounds``).
+
+    With ``chunk_size=None`` the whole level is generated at once and yielded
+    as a single chunk. Otherwise it is streamed with ``fractal.iter_coordinates``
+    in one pass, and each chunk is scaled as it arrives. Peak memory then
+    depends on ``chunk_size``, not on the size of the level.
+
+    With ``cache_dir`` set, the unscaled vertices come from the on-disk
+    geometry cache (see ``geometry_cache.cached_coordinates``). A re-render
+    that only changes styling then skips generation entirely.
+
+    Chunks are ``dtype`` arrays, scaled in place.
+    """
+    bounds = fractal.bounds(desired_recursion_level, start_pos=init_pos)
+
+    if cache_dir is not None:
+        from geometry_cache import cached_coordinates
+
+        cached = cached_coordinates(fractal, desired_recursion_level, start_pos=init_pos, cache_dir=cache_dir)
+        n = len(cached) - 1
+        if bounds is None:
+            bounds = (cached.min(axis=0), cached.max(axis=0))
+        transform = window_transform(bounds, window_size, padding)
+
+        if chunk_size is None:
+            return n, iter([(0, apply_window_transform(np.array(cached, dtype=dtype), transform, window_size))])
+
+        def cached_chunks():
+            for offset in range(0, n, chunk_size):
+                coords = np.array(cached[offset:min(offset + chunk_size, n) + 1], dtype=dtype)
+                yield offset, apply_window_transform(coords, transform, window_size)
+
+        return n, cached_chunks()
+
+    if chunk_size is None:
+        coords = fractal.coordinates(desired_recursion_level, start_pos=init_pos, dtype=dtype)
+        coords = scale_to_window(coords, window_size, padding, copy=False, bounds=bounds)
+
+        return len(coords) - 1, iter([(0, coords)])
+
+    n = fractal.edge_count(desired_recursion_level)
+    if bounds is None:
+        bounds = fractal.measure_bounds(desired_recursion_level, start_pos=init_pos)
+    transform = window_transform(bounds, window_size, padding)
+
+    def chunks():
+        offset = 0
+        for coords in fractal.iter_coordinates(desired_recursion_level, chunk_size, start_pos=init_pos, dtype=dtype):
+            yield offset, apply_window_transform(coords, transform, window_size)
+            offset += len(coords) - 1
+
+    return n, chunks()
+
+
+def color_lut(cmap=None, line_color=None, lut_size=256, bgr=False):
+    """
+    Sample the edge coloring once into a (k, 3) uint8 lookup table.
+
+    A solid ``line_color`` (RGB), or white when neither is given, gives a
+    one-row table. A colormap is sampled at ``lut_size`` evenly spaced points.
+    With the default 256 entries this reproduces matplotlib's own 256-color
+    tables exactly. Pass ``bgr=True`` for OpenCV frames.
+    """
+    if line_color is not None:
+        lut = np.array([line_color], dtype=np.uint8)
+    elif cmap is not None:
+        lut = (cmap(np.arange(lut_size) / lut_size)[:, :3] * 255).astype(np.uint8)
+    else:
+        lut = np.array([(255, 255, 255)], dtype=np.uint8)
+
+    if bgr:
+        lut = lut[:, ::-1]
+
+    return np.ascontiguousarray(lut)
+
+
+def lut_colors(lut, n, start=0, stop=None):
+    """
+    Colors of edges ``start`` to ``stop - 1`` out of ``n`` as a contiguous
+    (m, 3) uint8 array. Edge ``i`` maps to LUT row ``i * len(lut) // n`` in a
+    single vectorized step.
+
+    Quantizing the gradient to ``len(lut)`` colors makes consecutive edges
+    share a color, so ``draw_segments`` can batch them into one run. Each row
+    is repeated over its run of edges, so the output is the only allocation.
+    """
+    stop = n if stop is None else stop
+    k = len(lut)
+
+    # Row r covers the edges from ceil(r * n / k) up to ceil((r + 1) * n / k)
+    bounds = (np.arange(k + 1, dtype=np.int64) * max(n, 1) + k - 1) // k
+    return np.repeat(lut, np.diff(np.clip(bounds, start, stop)), axis=0)
+
+
+# Edges per block in decimate_segments and draw_segments, which bounds their per-edge temporaries
+SEGMENT_BLOCK = 1 << 18
+
+
+def decimate_segments(coords, colors, threshold=1.0):
+    """
+    Level-of-detail pass over a window-space polyline.
+
+    Splits the window into ``threshold``-pixel cells and collapses every run
+    of consecutive vertices that fall in the same cell into the run's first
+    vertex. The result is one segment per cell crossing, colored with the
+    mean of the edges it replaces. Returns ``(coords, colors)``.
+
+    With ``threshold=1`` the kept segments start and end in the same pixels
+    as the edges they replace, so the one-pixel raster is unchanged apart
+    from the blended colors. Drawing cost then follows the pixels the curve
+    covers, not its edge count. The renderers' ``lod_threshold`` is this
+    ``threshold``: larger cells trade detail for speed, and None or 0 draws
+    every edge.
+    """
+    m = len(coords) - 1
+    if not threshold or m <= 1:
+        return coords, colors
+
+    # Vertex i starts a new run when it leaves the cell of vertex i - 1. Found a block at a
+    # time, each block overlapping the previous one by a vertex, so the cell indices stay small
+    keep = [np.zeros(1, dtype=np.int64)]
+    for start in range(0, m, SEGMENT_BLOCK):
+        cells = np.floor(coords[start:start + SEGMENT_BLOCK + 1] / threshold).astype(np.int64)
+        keep.append(np.flatnonzero(np.any(cells[1:] != cells[:-1], axis=1)) + start + 1)
+
+    keep = np.concatenate(keep)
+    if keep[-1] != m:
+        # The run containing the last vertex still ends the polyline there
+        keep = np.append(keep, m)
+
+    if len(keep) - 1 == m:
+        return coords, colors
+
+    # Segment j replaces edges keep[j] .. keep[j + 1] - 1
+    sums = np.add.reduceat(colors, keep[:-1], axis=0, dtype=np.uint32)
+    counts = np.diff(keep)[:, None]
+    merged = ((sums + counts // 2) // counts).astype(np.uint8)
+
+    return coords[keep], merged
+
+
+def draw_segments(frame, coords, colors, line_width=1, max_pixels=1 << 22, lod_threshold=None, origin=(0, 0)):
+    """
+    Draw the polyline ``coords`` ((m + 1, 2) window coordinates) onto the
+    (h, w, 3) uint8 ``frame``. Edge ``i`` gets ``colors[i]`` from an (m, 3)
+    uint8 array in the frame's channel order. Edges are drawn in order, so
+    later edges paint over earlier ones, just like one ``cv2.line`` per edge.
+
+    One-pixel lines are rasterized with a vectorized integer DDA. Every pixel
+    of every segment is generated with NumPy and scattered into the frame, up
+    to ``max_pixels`` at a time. Cost scales with pixels touched, not with
+    interpreter calls. Wider lines go through ``cv2.polylines``, one call per
+    run of consecutive edges with the same color.
+
+    ``lod_threshold`` (pixels) first merges sub-threshold edges with
+    ``decimate_segments``. ``origin`` is the window position of the frame's
+    top-left pixel, for drawing into one tile of a larger canvas.
+    """
+    coords, colors = decimate_segments(coords, colors, lod_threshold)
+
+    m = len(coords) - 1
+    if m <= 0:
+        return frame
+
+    shift = np.array(origin, dtype=np.int64)
+
+    if line_width > 1:
+        import cv2
+
+        # Same truncation as int() on each endpoint; shift after truncating so tiles line up exactly
+        points = coords.astype(np.int64) - shift
+
+        # Split wherever the color changes; each run is a single polyline
+        changes = np.flatnonzero(np.any(colors[1:] != colors[:-1], axis=1)) + 1
+        run_starts = np.concatenate([[0], changes])
+        run_stops = np.concatenate([changes, [m]])
+
+        for start, stop in zip(run_starts.tolist(), run_stops.tolist()):
+            run = points[start:stop + 1].astype(np.int32).reshape(-1, 1, 2)
+            cv2.polylines(frame, [run], False, colors[start].tolist(), line_width)
+
+        return frame
+
+    # A block of edges at a time, in order, so the per-edge temporaries stay block-sized
+    for start in range(0, m, SEGMENT_BLOCK):
+        stop = min(start + SEGMENT_BLOCK, m)
+        points = coords[start:stop + 1].astype(np.int64) - shift
+        rasterize_lines(frame, points[:-1], points[1:], colors[start:stop], max_pixels)
+
+    return frame
+
+
+def rasterize_lines(frame, starts, ends, colors, max_pixels=1 << 22):
+    """
+    Draw independent one-pixel segments from ``starts[i]`` to ``ends[i]``
+    ((m, 2) integer pixel coordinates) in ``colors[i]`` onto ``frame``, in
+    index order, with the vectorized integer DDA behind ``draw_segments``.
+    Pixels outside the frame are clipped.
+
+    The pixels are those of an 8-connected ``cv2.line``: each segment is
+    walked left to right, and a minor-axis offset that lands exactly halfway
+    between two pixels rounds down, as in OpenCV's Bresenham iterator.
+    """
+    m = len(starts)
+    height, width = frame.shape[:2]
+    pixels = frame.reshape(-1, 3)
+
+    # Like cv2.line, walk every segment left to right
+    flip = (ends[:, 0] < starts[:, 0])[:, np.newaxis]
+    starts, ends = np.where(flip, ends, starts), np.where(flip, starts, ends)
+
+    x0, y0 = starts[:, 0], starts[:, 1]
+    dx = ends[:, 0] - x0
+    dy = ends[:, 1] - y0
+    # The major axis is x on ties, as in OpenCV
+    x_major = np.abs(dx) >= np.abs(dy)
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+    minor_steps = np.minimum(np.abs(dx), np.abs(dy))
+    counts = steps + 1  # Both endpoints, like cv2.line
+
+    # Batch edges so that no batch scatters more than max_pixels pixels
+    pixel_ends = np.cumsum(counts)
+    batch_start = 0
+    while batch_start < m:
+        done = pixel_ends[batch_start - 1] if batch_start else 0
+        batch_stop = max(batch_start + 1, int(np.searchsorted(pixel_ends, done + max_pixels, side='right')))
+        batch = slice(batch_start, batch_stop)
+
+        seg = np.repeat(np.arange(batch_start, batch_stop), counts[batch])
+        k = np.arange(len(seg)) - np.repeat(pixel_ends[batch] - counts[batch] - done, counts[batch])
+
+        # Minor-axis offset of pixel k: ceil(d * k / D - 1/2), i.e. rounded with ties down
+        n_steps = np.maximum(steps[seg], 1)
+        minor = -((n_steps - 2 * minor_steps[seg] * k) // (2 * n_steps))
+        major = x_major[seg]
+        x = x0[seg] + np.sign(dx[seg]) * np.where(major, k, minor)
+        y = y0[seg] + np.sign(dy[seg]) * np.where(major, minor, k)
+
+        visible = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+
+        # Fancy assignment writes in index order, so the last edge to touch a pixel wins
+        pixels[y[visible] * width + x[visible]] = colors[seg[visible]]
+
+        batch_start = batch_stop
+
+    return frame
+
+
 def save_fractal(fractal, init_pos, desired_recursion_level,
                  output_file='fractal.png', size=(2000, 2000),
-                 line_width=1, cmap=None, background_color=(0, 0, 0), line_color=None, padding=50):
+                 line_width=1, cmap=None, background_color=(0, 0, 0), line_color=None, padding=50,
+                 chunk_size=None, cache_dir=None, lod_threshold=1.0, coordinate_dtype=np.float64):
     """
     Render fractal to an image file (no animation).
 
@@ -250,6 +934,12 @@ def save_fractal(fractal, init_pos, desired_recursion_level,
         cmap: Matplotlib colormap
         background_color: RGB tuple for background
         padding: Padding from edges
+        chunk_size: Stream the fractal in chunks of this many edges instead of
+            generating the whole level at once (bounds peak memory)
+        cache_dir: Directory of the on-disk geometry cache; reuses vertices
+            generated by earlier renders with the same fractal and level
+        lod_threshold: Level-of-detail cell size in pixels (see decimate_segments)
+        coordinate_dtype: dtype of the vertices (see Fractal.compute_coordinates)
     """
     try:
         import cv2
@@ -258,45 +948,276 @@ def save_fractal(fractal, init_pos, desired_recursion_level,
         print("Install with: pip install opencv-python")
         return
 
-    print('--Making Fractal--')
-    edges = fractal.generate(desired_recursion_level=desired_recursion_level)
-
-    print('--Computing Coordinates--')
-    coords = fractal.compute_coordinates(edges, start_pos=init_pos)
-    n = len(coords) - 1
-
-    # Scale to fit
-    coords = scale_to_window(coords, size, padding)
-
-    # Pre-compute colors (BGR for OpenCV)
-    if line_color is not None:
-        colors = [line_color[::-1]] * n  # Convert RGB to BGR
-    elif cmap is not None:
-        colors = [tuple(int(c * 255) for c in cmap(i / n)[:3])[::-1] for i in range(n)]
-    else:
-        colors = [(255, 255, 255)] * n
+    # Scaled to fit
+    n, chunks = window_coordinate_chunks(fractal, desired_recursion_level, init_pos, size, padding, chunk_size,
+                                         cache_dir, coordinate_dtype)
 
     # Create image with background
     frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
     frame[:] = background_color[::-1]  # BGR
 
-    print(f'--Drawing {n} edges--')
+    # Colors (BGR for OpenCV)
+    lut = color_lut(cmap, line_color, bgr=True)
 
-    # Draw all edges
-    for i in range(n):
-        start = (int(coords[i][0]), int(coords[i][1]))
-        end = (int(coords[i + 1][0]), int(coords[i + 1][1]))
-        cv2.line(frame, start, end, colors[i], line_width)
+    # Draw all edges; with chunk_size, this includes streaming them in
+    with instrument.stage('draw', edges=n) as stage:
+        for offset, coords in chunks:
+            m = len(coords) - 1
+            draw_segments(frame, coords, lut_colors(lut, n, offset, offset + m), line_width,
+                          lod_threshold=lod_threshold)
+            stage.advance(m)
 
     # Save to file
-    cv2.imwrite(output_file, frame)
-    print(f'--Saved to {output_file}--')
+    with instrument.stage('write_png', pixels=size[0] * size[1]):
+        cv2.imwrite(output_file, frame)
+    instrument.event('saved', output_file=output_file)
+
+
+def _record_progressive(out, frame, chunks, n, edges_per_frame, line_width, lut, lod_threshold=None):
+    """
+    Draw the ``(offset, coords)`` chunks onto ``frame``, colored from ``lut``
+    (see ``color_lut``), and write a video frame every ``edges_per_frame``
+    edges and after the last edge. Returns the number of frames written.
+    """
+    frame_count = 0
+
+    with instrument.stage('record', edges=n, edges_per_frame=edges_per_frame) as stage:
+        for offset, coords in chunks:
+            m = len(coords) - 1
+            colors = lut_colors(lut, n, offset, offset + m)
+
+            # Draw up to each frame boundary in one batch, then emit the frame
+            start = 0
+            while start < m:
+                stop = min(m, (offset + start) // edges_per_frame * edges_per_frame + edges_per_frame - offset)
+                draw_segments(frame, coords[start:stop + 1], colors[start:stop], line_width,
+                              lod_threshold=lod_threshold)
+
+                drawn_edges = offset + stop
+                if drawn_edges % edges_per_frame == 0 or drawn_edges == n:
+                    out.write(frame)
+                    frame_count += 1
+
+                start = stop
+
+            stage.advance(m)
+
+    return frame_count
+
+
+# Arrays shared with video worker processes, attached once per worker by _attach_shared_arrays
+_SHARED_ARRAYS = {}
+
+
+def _attach_shared_arrays(specs):
+    from multiprocessing import shared_memory
+
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        # Keep the handle alive as long as the array view
+        _SHARED_ARRAYS[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+
+# The canvas the last segment of this video worker ended on, and its edge count, keyed by the segment's style
+_VIDEO_CANVAS = {}
+
+
+def _render_video_segment(task):
+    """
+    Worker: render frames ``frame_start`` to ``frame_stop - 1`` of a progressive
+    video. Frames go to an encoded segment file (ffmpeg) or to a raw ``.npy``
+    frame stack (OpenCV fallback). Returns the number of frames.
+
+    The segment starts from the canvas this worker's previous segment ended
+    on, and only draws the edges in between. Segments are handed out in
+    order, so each worker draws the curve about once, however many segments
+    there are. The gap is drawn in the same per-frame batches as the frames,
+    so every frame comes out the same whichever worker renders it.
+    """
+    coords = _SHARED_ARRAYS['coords'][1]
+    colors = _SHARED_ARRAYS['colors'][1]
+    n = len(colors)
+
+    epf = task['edges_per_frame']
+    first_edge = task['frame_start'] * epf
+
+    key = (tuple(task['size']), tuple(task['background']), task['line_width'], task['lod_threshold'], epf)
+    drawn, frame = _VIDEO_CANVAS.pop(key, (None, None))
+    if drawn is None or drawn > first_edge:
+        drawn = 0
+        frame = np.zeros((task['size'][1], task['size'][0], 3), dtype=np.uint8)
+        frame[:] = task['background']
+
+    for start in range(drawn, first_edge, epf):
+        stop = min(start + epf, first_edge)
+        draw_segments(frame, coords[start:stop + 1], colors[start:stop], task['line_width'],
+                      lod_threshold=task['lod_threshold'])
+
+    count = task['frame_stop'] - task['frame_start']
+    if task['raw']:
+        out = np.lib.format.open_memmap(task['path'], mode='w+', dtype=np.uint8, shape=(count,) + frame.shape)
+    else:
+        out = FFmpegVideoWriter(task['path'], task['fps'], task['size'], hold_frames=task['hold_frames'],
+                                **task['video_options'])
+
+    for i, frame_idx in enumerate(range(task['frame_start'], task['frame_stop'])):
+        start = frame_idx * epf
+        stop = min(start + epf, n)
+        draw_segments(frame, coords[start:stop + 1], colors[start:stop], task['line_width'],
+                      lod_threshold=task['lod_threshold'])
+
+        if task['raw']:
+            out[i] = frame
+        else:
+            out.write(frame)
+
+    if task['raw']:
+        out.flush()
+        del out
+    else:
+        out.release()
+
+    _VIDEO_CANVAS[key] = (min(task['frame_stop'] * epf, n), frame)
+    return count + task['hold_frames']
+
+
+# Largest raw frame stack one segment writes in the OpenCV fallback
+RAW_SEGMENT_BYTES = 1 << 30
+
+
+def _record_parallel(output_file, chunks, n, edges_per_frame, size, line_width, lut, background_color,
+                     fps, hold_frames, workers, video_backend='auto', video_options=None, lod_threshold=None,
+                     dtype=np.float64):
+    """
+    Render a progressive-draw video on ``workers`` processes.
+
+    Every frame depends only on how many edges are drawn by then. The frame
+    timeline is therefore split into contiguous segments that workers render
+    independently. The scaled coordinates and colors are shared with them
+    through shared memory, not pickled.
+    - With ffmpeg, each worker also encodes its own segment, and the segments
+      are joined without re-encoding.
+    - With OpenCV, workers hand back raw frame stacks, which this process
+      encodes in order on a background thread. Stacks are at most
+      ``RAW_SEGMENT_BYTES``, and only ``workers + 1`` segments are in flight
+      at once. Workers therefore can't run far ahead of the single encoder,
+      and the temporary disk space stays bounded however long the video is.
+
+    Returns the total number of frames written, hold frames included.
+    """
+    import os
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+
+    video_options = dict(video_options or {})
+    ffmpeg = video_options.get('ffmpeg', 'ffmpeg')
+    raw = resolve_backend(video_backend, ffmpeg) != 'ffmpeg'
+
+    coords_shm = shared_memory.SharedMemory(create=True, size=max(1, (n + 1) * 2 * np.dtype(dtype).itemsize))
+    colors_shm = shared_memory.SharedMemory(create=True, size=max(1, n * 3))
+
+    try:
+        coords = np.ndarray((n + 1, 2), dtype=dtype, buffer=coords_shm.buf)
+        colors = np.ndarray((n, 3), dtype=np.uint8, buffer=colors_shm.buf)
+
+        # Fill the shared buffers straight from the chunk stream
+        with instrument.stage('share', edges=n) as stage:
+            for offset, chunk in chunks:
+                m = len(chunk) - 1
+                coords[offset:offset + m + 1] = chunk
+                colors[offset:offset + m] = lut_colors(lut, n, offset, offset + m)
+                stage.advance(m)
+
+        specs = {
+            'coords': (coords_shm.name, coords.shape, coords.dtype),
+            'colors': (colors_shm.name, colors.shape, colors.dtype),
+        }
+
+        total_frames = -(-n // edges_per_frame)
+        # A few segments per worker keeps the pool busy when segments finish unevenly
+        n_segments = max(1, min(total_frames, workers * 4))
+        if raw:
+            frame_bytes = size[0] * size[1] * 3
+            n_segments = max(n_segments, min(total_frames, -(-total_frames * frame_bytes // RAW_SEGMENT_BYTES)))
+        bounds = np.linspace(0, total_frames, n_segments + 1).astype(int)
+
+        encoder_options = {key: value for key, value in video_options.items() if key != 'fourcc' and value is not None}
+        suffix = '.npy' if raw else os.path.splitext(output_file)[1]
+
+        with tempfile.TemporaryDirectory(prefix='fractal_video_') as tmp_dir:
+            tasks = [
+                {
+                    'path': os.path.join(tmp_dir, f'segment_{i:05d}{suffix}'),
+                    'frame_start': int(bounds[i]),
+                    'frame_stop': int(bounds[i + 1]),
+                    # ffmpeg segments carry the hold at the end of the last one
+                    'hold_frames': hold_frames if (i == n_segments - 1 and not raw) else 0,
+                    'edges_per_frame': edges_per_frame,
+                    'size': size,
+                    'background': background_color[::-1],  # BGR
+                    'line_width': line_width,
+                    'lod_threshold': lod_threshold,
+                    'fps': fps,
+                    'raw': raw,
+                    'video_options': encoder_options,
+                }
+                for i in range(n_segments)
+            ]
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared_arrays, initargs=(specs,)) as pool, \
+                    instrument.stage('record', edges=n, total=total_frames, unit='frames', segments=n_segments,
+                                     workers=workers) as stage:
+                if not raw:
+                    frame_count = 0
+                    for count in pool.map(_render_video_segment, tasks):
+                        frame_count += count
+                        stage.advance(count)
+
+                    with instrument.stage('concat', segments=n_segments):
+                        concat_videos([task['path'] for task in tasks], output_file, ffmpeg=ffmpeg)
+                    return frame_count
+
+                out = BackgroundVideoWriter(open_video_writer(output_file, fps, size, 'opencv', hold_frames,
+                                                              **video_options))
+                frame_count = 0
+
+                # Encode segments in order as soon as each one is ready. The next segment is submitted
+                # only once one has been encoded and deleted, so at most workers + 1 stacks exist at a time.
+                queued = iter(tasks)
+                in_flight = deque((task, pool.submit(_render_video_segment, task))
+                                  for task in itertools.islice(queued, workers + 1))
+                while in_flight:
+                    task, future = in_flight.popleft()
+                    future.result()
+                    frames = np.load(task['path'], mmap_mode='r')
+                    for frame in frames:
+                        out.write(frame)
+                    frame_count += len(frames)
+                    stage.advance(len(frames))
+                    del frames
+                    os.remove(task['path'])
+
+                    for next_task in itertools.islice(queued, 1):
+                        in_flight.append((next_task, pool.submit(_render_video_segment, next_task)))
+
+                out.release()
+
+                return frame_count + hold_frames
+
+    finally:
+        coords_shm.close()
+        coords_shm.unlink()
+        colors_shm.close()
+        colors_shm.unlink()
 
 
 def save_fractal_video(fractal, init_pos, desired_recursion_level,
                        output_file='fractal.mp4', size=(900, 900),
                        line_width=1, cmap=None, background_color=(0, 0, 0), line_color=None,
-                       padding=50, edges_per_frame=None, duration=None, fps=60):
+                       padding=50, edges_per_frame=None, duration=None, fps=60, chunk_size=None,
+                       cache_dir=None, video_backend='auto', video_options=None, workers=None, lod_threshold=1.0,
+                       coordinate_dtype=np.float64):
     """
     Render fractal animation to MP4 video file.
 
@@ -313,6 +1234,17 @@ def save_fractal_video(fractal, init_pos, desired_recursion_level,
         edges_per_frame: Edges drawn per frame (overrides duration)
         duration: Target duration in seconds (used to calculate edges_per_frame)
         fps: Frames per second of output video
+        chunk_size: Stream the fractal in chunks of this many edges instead of
+            generating the whole level at once (bounds peak memory)
+        cache_dir: Directory of the on-disk geometry cache; reuses vertices
+            generated by earlier renders with the same fractal and level
+        video_backend: 'ffmpeg', 'opencv' or 'auto' (ffmpeg when installed, else OpenCV)
+        video_options: Encoder options for video.open_video_writer, e.g.
+            {'codec': 'libx265', 'crf': 24, 'preset': 'slow', 'threads': 8}
+        workers: Render the video on this many processes (segments of the
+            timeline in parallel); None or 1 renders on this process
+        lod_threshold: Level-of-detail cell size in pixels (see decimate_segments)
+        coordinate_dtype: dtype of the vertices (see Fractal.compute_coordinates)
     """
     try:
         import cv2
@@ -321,12 +1253,9 @@ def save_fractal_video(fractal, init_pos, desired_recursion_level,
         print("Install with: pip install opencv-python")
         return
 
-    print('--Making Fractal--')
-    edges = fractal.generate(desired_recursion_level=desired_recursion_level)
-
-    print('--Computing Coordinates--')
-    coords = fractal.compute_coordinates(edges, start_pos=init_pos)
-    n = len(coords) - 1
+    # Scaled to fit
+    n, chunks = window_coordinate_chunks(fractal, desired_recursion_level, init_pos, size, padding, chunk_size,
+                                         cache_dir, coordinate_dtype)
 
     # Calculate edges_per_frame from duration if specified
     if edges_per_frame is not None:
@@ -336,61 +1265,46 @@ def save_fractal_video(fractal, init_pos, desired_recursion_level,
         # Calculate edges_per_frame to achieve target duration
         total_frames = int(duration * fps)
         edges_per_frame = max(1, n // total_frames)
-        print(f'--Target duration: {duration}s ({edges_per_frame} edges/frame)--')
+        instrument.event('edges_per_frame', edges_per_frame=edges_per_frame, duration=duration)
     else:
         # Default: draw as fast as possible (all edges in ~2 seconds of video)
         edges_per_frame = max(1, n // (fps * 2))
 
-    # Scale to fit
-    coords = scale_to_window(coords, size, padding)
+    hold_frames = fps * 2
 
-    # Pre-compute colors (BGR for OpenCV)
-    if line_color is not None:
-        colors = [line_color[::-1]] * n  # Convert RGB to BGR
-    elif cmap is not None:
-        colors = [tuple(int(c * 255) for c in cmap(i / n)[:3])[::-1] for i in range(n)]
-    else:
-        colors = [(255, 255, 255)] * n
+    if workers is not None and workers > 1:
+        frame_count = _record_parallel(output_file, chunks, n, edges_per_frame, size, line_width,
+                                       color_lut(cmap, line_color, bgr=True), background_color, fps,
+                                       hold_frames, workers, video_backend, video_options, lod_threshold,
+                                       coordinate_dtype)
+        instrument.event('saved', output_file=output_file, frames=frame_count)
+        return
 
-    # Initialize video writer
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(output_file, fourcc, fps, size)
+    # Initialize video writer; encoding runs on a background thread while we draw. It holds the final frame
+    # for 2 seconds itself.
+    out = BackgroundVideoWriter(open_video_writer(output_file, fps, size, video_backend, hold_frames,
+                                                  **(video_options or {})))
 
     # Create initial frame with background
     frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
     frame[:] = background_color[::-1]  # BGR
 
-    print(f'--Recording {n} edges--')
-
     # Draw frames progressively
-    drawn_edges = 0
-    frame_count = 0
+    frame_count = _record_progressive(out, frame, chunks, n, edges_per_frame, line_width,
+                                      color_lut(cmap, line_color, bgr=True), lod_threshold)
 
-    while drawn_edges < n:
-        end_idx = min(drawn_edges + edges_per_frame, n)
-
-        for i in range(drawn_edges, end_idx):
-            start = (int(coords[i][0]), int(coords[i][1]))
-            end = (int(coords[i + 1][0]), int(coords[i + 1][1]))
-            cv2.line(frame, start, end, colors[i], line_width)
-
-        out.write(frame)
-        drawn_edges = end_idx
-        frame_count += 1
-
-    # Hold final frame for 2 seconds
-    hold_frames = fps * 2
-    for _ in range(hold_frames):
-        out.write(frame)
-
-    out.release()
-    print(f'--Saved to {output_file} ({frame_count + hold_frames} frames)--')
+    # Waits for the encoder to catch up with the drawing
+    with instrument.stage('finish_encoding'):
+        out.release()
+    instrument.event('saved', output_file=output_file, frames=frame_count + hold_frames)
 
 
 def save_multilevel_video(fractal_class, levels, init_length, fractal_kwargs,
                           output_file='fractal_levels.mp4', size=(900, 900),
                           line_width=1, cmap=None, background_color=(0, 0, 0), line_color=None,
-                          padding=50, edges_per_frame=None, duration=None, fps=60):
+                          padding=50, edges_per_frame=None, duration=None, fps=60, chunk_size=None,
+                          cache_dir=None, video_backend='auto', video_options=None, lod_threshold=1.0,
+                          coordinate_dtype=np.float64):
     """
     Render multiple fractal levels into a single MP4 video, stitched together.
 
@@ -409,6 +1323,15 @@ def save_multilevel_video(fractal_class, levels, init_length, fractal_kwargs,
         edges_per_frame: Edges drawn per frame (overrides duration)
         duration: Target duration in seconds PER LEVEL
         fps: Frames per second of output video
+        chunk_size: Stream each level in chunks of this many edges instead of
+            generating it at once (bounds peak memory)
+        cache_dir: Directory of the on-disk geometry cache; reuses vertices
+            generated by earlier renders with the same fractal and level
+        video_backend: 'ffmpeg', 'opencv' or 'auto' (ffmpeg when installed, else OpenCV)
+        video_options: Encoder options for video.open_video_writer, e.g.
+            {'codec': 'libx265', 'crf': 24, 'preset': 'slow', 'threads': 8}
+        lod_threshold: Level-of-detail cell size in pixels (see decimate_segments)
+        coordinate_dtype: dtype of the vertices (see Fractal.compute_coordinates)
     """
     try:
         import cv2
@@ -417,24 +1340,22 @@ def save_multilevel_video(fractal_class, levels, init_length, fractal_kwargs,
         print("Install with: pip install opencv-python")
         return
 
-    # Initialize video writer
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(output_file, fourcc, fps, size)
+    # Initialize video writer; encoding runs on a background thread while we draw. It holds the last level's
+    # final frame for 2 seconds itself.
+    out = BackgroundVideoWriter(open_video_writer(output_file, fps, size, video_backend, fps * 2,
+                                                  **(video_options or {})))
 
     total_frame_count = 0
 
-    for level_idx, level in enumerate(levels):
-        print(f'\n--Level {level} ({level_idx + 1}/{len(levels)})--')
-
-        # Create fresh fractal instance for each level
-        fractal = fractal_class(init_length, **fractal_kwargs)
+    # One instance for all levels, so its level cache lets each level build on the previous one
+    fractal = fractal_class(init_length, **fractal_kwargs)
 
-        print('--Making Fractal--')
-        edges = fractal.generate(desired_recursion_level=level)
+    for level_idx, level in enumerate(levels):
+        instrument.event('level', level=level, index=level_idx, levels=len(levels))
 
-        print('--Computing Coordinates--')
-        coords = fractal.compute_coordinates(edges, start_pos=(0, 0))
-        n = len(coords) - 1
+        # Scaled to fit
+        n, chunks = window_coordinate_chunks(fractal, level, (0, 0), size, padding, chunk_size, cache_dir,
+                                             coordinate_dtype)
 
         # Calculate edges_per_frame from duration if specified (per level)
         level_edges_per_frame = edges_per_frame
@@ -443,53 +1364,28 @@ def save_multilevel_video(fractal_class, levels, init_length, fractal_kwargs,
         elif duration is not None and duration > 0:
             total_frames = int(duration * fps)
             level_edges_per_frame = max(1, n // total_frames)
-            print(f'--Target duration: {duration}s ({level_edges_per_frame} edges/frame)--')
+            instrument.event('edges_per_frame', edges_per_frame=level_edges_per_frame, duration=duration, level=level)
         else:
             # Default: ~2 seconds per level
             level_edges_per_frame = max(1, n // (fps * 2))
 
-        # Scale to fit
-        coords = scale_to_window(coords, size, padding)
-
-        # Pre-compute colors (BGR for OpenCV)
-        if line_color is not None:
-            colors = [line_color[::-1]] * n
-        elif cmap is not None:
-            colors = [tuple(int(c * 255) for c in cmap(i / n)[:3])[::-1] for i in range(n)]
-        else:
-            colors = [(255, 255, 255)] * n
-
         # Create initial frame with background
         frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
         frame[:] = background_color[::-1]  # BGR
 
-        print(f'--Recording {n} edges--')
-
         # Draw frames progressively
-        drawn_edges = 0
-        frame_count = 0
+        frame_count = _record_progressive(out, frame, chunks, n, level_edges_per_frame, line_width,
+                                          color_lut(cmap, line_color, bgr=True), lod_threshold)
 
-        while drawn_edges < n:
-            end_idx = min(drawn_edges + level_edges_per_frame, n)
-
-            for i in range(drawn_edges, end_idx):
-                start = (int(coords[i][0]), int(coords[i][1]))
-                end = (int(coords[i + 1][0]), int(coords[i + 1][1]))
-                cv2.line(frame, start, end, colors[i], line_width)
-
-            out.write(frame)
-            drawn_edges = end_idx
-            frame_count += 1
-
-        # Hold final frame for 1 second between levels (2 seconds for last level)
+        # Hold final frame for 1 second between levels (2 seconds for last level, by the writer)
         hold_seconds = 2 if level_idx == len(levels) - 1 else 1
         hold_frames = fps * hold_seconds
-        for _ in range(hold_frames):
-            out.write(frame)
+        if level_idx < len(levels) - 1:
+            out.write(frame, repeat=hold_frames)
 
         total_frame_count += frame_count + hold_frames
-        print(f'--Level {level} complete ({frame_count + hold_frames} frames)--')
 
-    out.release()
-    total_duration = total_frame_count / fps
-    print(f'\n--Saved to {output_file} ({total_frame_count} frames, {total_duration:.1f}s total)--')
+    with instrument.stage('finish_encoding'):
+        out.release()
+    instrument.event('saved', output_file=output_file, frames=total_frame_count, seconds=total_frame_count / fps)
+
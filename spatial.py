@@ -0,0 +1,82 @@
+import numpy as np
+
+
+class SegmentGrid:
+    """
+    Uniform grid index over the segments of a polyline.
+
+    Segment ``i`` runs from ``coords[i]`` to ``coords[i + 1]``. It is filed
+    under every cell that its bounding box, grown by ``margin``, overlaps.
+    Cell ``(row, col)`` covers ``[x0 + col * cell_size, x0 + (col + 1) * cell_size)``
+    horizontally, where ``(x0, y0)`` is ``origin``, and likewise vertically.
+    Segments outside the grid's ``(rows, cols)`` shape are not indexed.
+
+    The index is stored CSR-style: ``segments`` holds the segment indices
+    grouped by cell, ascending within each cell, and ``cell_starts[c]`` is
+    where cell ``c`` (``row * cols + col``) begins. Building it is a handful
+    of NumPy passes over the segments. A lookup is a slice.
+    """
+
+    def __init__(self, coords, cell_size, origin=(0, 0), shape=None, margin=0):
+
+        coords = np.asarray(coords)
+        self.cell_size = cell_size
+        self.origin = (float(origin[0]), float(origin[1]))
+
+        if shape is None:
+            extent = coords.max(axis=0) - self.origin if len(coords) else np.zeros(2)
+            shape = (int(extent[1] // cell_size) + 1, int(extent[0] // cell_size) + 1)
+        self.shape = rows, cols = shape
+
+        lo = np.minimum(coords[:-1], coords[1:]) - margin - self.origin
+        hi = np.maximum(coords[:-1], coords[1:]) + margin - self.origin
+
+        first = np.floor(lo / cell_size).astype(np.int64)
+        last = np.floor(hi / cell_size).astype(np.int64)
+        inside = np.flatnonzero(
+            (last[:, 0] >= 0) & (first[:, 0] < cols) & (last[:, 1] >= 0) & (first[:, 1] < rows)
+        )
+
+        first = np.maximum(first[inside], 0)
+        last = np.minimum(last[inside], [cols - 1, rows - 1])
+        span_x = last[:, 0] - first[:, 0] + 1
+        spans = span_x * (last[:, 1] - first[:, 1] + 1)
+
+        # One (cell, segment) entry per cell each segment overlaps
+        entry = np.repeat(np.arange(len(inside)), spans)
+        k = np.arange(len(entry)) - np.repeat(np.cumsum(spans) - spans, spans)
+        col = first[entry, 0] + k % span_x[entry]
+        row = first[entry, 1] + k // span_x[entry]
+        cell = row * cols + col
+
+        # Stable, so segments stay in drawing order within each cell
+        order = np.argsort(cell, kind='stable')
+        index_dtype = np.int32 if len(coords) < 1 << 31 else np.int64
+
+        self.segments = inside[entry[order]].astype(index_dtype)
+        self.cell_starts = np.concatenate([[0], np.cumsum(np.bincount(cell, minlength=rows * cols))])
+
+    def cell(self, row, col):
+        """Indices of the segments filed under cell ``(row, col)``, ascending."""
+        c = row * self.shape[1] + col
+        return self.segments[self.cell_starts[c]:self.cell_starts[c + 1]]
+
+    def query(self, x0, y0, x1, y1):
+        """Ascending, de-duplicated indices of the segments that may touch the rectangle ``[x0, x1] x [y0, y1]``."""
+        rows, cols = self.shape
+        col0 = max(int((x0 - self.origin[0]) // self.cell_size), 0)
+        col1 = min(int((x1 - self.origin[0]) // self.cell_size), cols - 1)
+        row0 = max(int((y0 - self.origin[1]) // self.cell_size), 0)
+        row1 = min(int((y1 - self.origin[1]) // self.cell_size), rows - 1)
+
+        if col0 > col1 or row0 > row1:
+            return self.segments[:0]
+
+        parts = [
+            self.segments[self.cell_starts[row * cols + col0]:self.cell_starts[row * cols + col1 + 1]]
+            for row in range(row0, row1 + 1)
+        ]
+        if len(parts) == 1 and col0 == col1:
+            return parts[0]
+
+        return np.unique(np.concatenate(parts))
@@ -0,0 +1,322 @@
+import struct
+import zlib
+
+import numpy as np
+
+import instrument
+from rendering_pygame import (_SHARED_ARRAYS, _attach_shared_arrays, color_lut, decimate_segments, draw_segments,
+                              lut_colors, rasterize_lines, window_coordinate_chunks)
+from spatial import SegmentGrid
+
+
+# Thick segments up to this many pixels along their major axis are drawn whole into a tile's scratch frame;
+# longer ones are drawn in pieces this long, so the frame only needs this much margin
+THICK_PIECE = 64
+
+
+class PNGStripWriter:
+    """
+    Write an 8-bit RGB PNG a strip of rows at a time.
+
+    Rows are Sub-filtered and pushed through one streaming zlib compressor,
+    so only the strip being written is ever in memory, whatever the image
+    size. ``write_rows`` takes (k, width, 3) uint8 rows in BGR order, like
+    OpenCV frames.
+    """
+
+    def __init__(self, output_file, width, height, compression=6):
+
+        self.output_file = output_file
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+
+        self._file = open(output_file, 'wb')
+        self._compressor = zlib.compressobj(compression)
+
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        # 8 bits per channel, truecolor, deflate, adaptive filtering, no interlace
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def _chunk(self, kind, data):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(kind)
+        self._file.write(data)
+        self._file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+    def write_rows(self, rows):
+
+        k = len(rows)
+        if rows.shape[1:] != (self.width, 3):
+            raise ValueError(f'Rows of shape {rows.shape[1:]} do not match image width {self.width}')
+        if self.rows_written + k > self.height:
+            raise ValueError(f'{self.rows_written + k} rows written to a {self.height}-row image')
+
+        rgb = rows[:, :, ::-1].reshape(k, -1)
+
+        # Filter type 1 (Sub): each byte minus the same channel of the pixel to its left
+        scanlines = np.empty((k, 1 + 3 * self.width), dtype=np.uint8)
+        scanlines[:, 0] = 1
+        scanlines[:, 1:4] = rgb[:, :3]
+        np.subtract(rgb[:, 3:], rgb[:, :-3], out=scanlines[:, 4:])
+
+        data = self._compressor.compress(scanlines.data)
+        if data:
+            self._chunk(b'IDAT', data)
+
+        self.rows_written += k
+
+    def close(self):
+
+        if self.rows_written != self.height:
+            self._file.close()
+            raise ValueError(f'Only {self.rows_written} of {self.height} rows were written to {self.output_file}')
+
+        self._chunk(b'IDAT', self._compressor.flush())
+        self._chunk(b'IEND', b'')
+        self._file.close()
+
+
+def render_tile(frame, origin, coords, colors, segments, line_width=1):
+    """
+    Draw the segments with indices ``segments`` (ascending) of the window-space
+    polyline ``coords`` onto ``frame``, a tile whose top-left pixel sits at
+    window position ``origin``.
+    """
+    if len(segments) == 0:
+        return frame
+
+    if line_width == 1:
+        # One DDA pass over all of the tile's segments, shifted after truncation like draw_segments
+        shift = np.array(origin, dtype=np.int64)
+        starts = coords[segments].astype(np.int64) - shift
+        ends = coords[segments + 1].astype(np.int64) - shift
+        return rasterize_lines(frame, starts, ends, colors[segments])
+
+    # cv2 clips thick lines against the image it draws into, and clipping moves their pixels. So draw
+    # into a scratch frame with a margin that holds every segment near the tile whole. Segments too long
+    # for the margin are cut into pieces at fixed points along them, the same pieces in every tile.
+    height, width = frame.shape[:2]
+    pad = THICK_PIECE + 2 * line_width + 2
+    scratch = np.empty((height + 2 * pad, width + 2 * pad, 3), dtype=np.uint8)
+    tile = scratch[pad:pad + height, pad:pad + width]
+    tile[...] = frame
+
+    # Truncated like draw_segments, in scratch pixels
+    low = np.array(origin, dtype=np.int64) - pad
+    starts = coords[segments].astype(np.int64) - low
+    ends = coords[segments + 1].astype(np.int64) - low
+    cut = np.abs(ends - starts).max(axis=1) > THICK_PIECE
+
+    # Thick lines keep their joins, so draw each run of consecutive whole segments as one polyline
+    reach = line_width + 1
+    window = (pad - reach, pad - reach, pad + width + reach, pad + height + reach)
+    breaks = np.flatnonzero((np.diff(segments) != 1) | cut[1:] | cut[:-1]) + 1
+    for run in np.split(np.arange(len(segments)), breaks):
+        first, last = int(run[0]), int(run[-1])
+        s, e = int(segments[first]), int(segments[last])
+        if cut[first]:
+            draw_thick_pieces(scratch, starts[first], ends[first], colors[s].tolist(), line_width, window)
+        else:
+            draw_segments(scratch, coords[s:e + 2], colors[s:e + 1], line_width, origin=tuple(low.tolist()))
+
+    frame[...] = tile
+    return frame
+
+
+def draw_thick_pieces(image, start, end, color, line_width, window):
+    """
+    Draw the thick line from ``start`` to ``end`` (integer pixels) like
+    ``cv2.line``, but only its ``THICK_PIECE`` long pieces that come near
+    ``window``, an ``(x0, y0, x1, y1)`` rectangle. Every piece is filled with
+    the polygon offset cv2 computes for the whole line, and the round caps go
+    on the true ends only, so the pieces join up into that line.
+    """
+    import cv2
+
+    delta = (end - start).astype(np.float64)
+    steps = int(np.abs(end - start).max())
+
+    # The sides of cv2's ThickLine polygon, in 1/65536 pixels
+    radius = ((line_width << 15) + (line_width & 1) * (1 << 15)) / np.hypot(*delta)
+    side = np.rint([delta[1] * radius, -delta[0] * radius]).astype(np.int64)
+
+    # Piece k runs between the points THICK_PIECE * k and THICK_PIECE * (k + 1) steps along the line
+    cuts = np.minimum(np.arange(0, steps + THICK_PIECE, THICK_PIECE), steps) / steps
+    points = start * 65536 + np.rint(cuts[:, np.newaxis] * delta * 65536).astype(np.int64)
+
+    margin = (np.abs(side).max() >> 16) + 1
+    lows = np.minimum(points[:-1], points[1:]) >> 16
+    highs = np.maximum(points[:-1], points[1:]) >> 16
+    near = ((highs[:, 0] + margin >= window[0]) & (highs[:, 1] + margin >= window[1]) &
+            (lows[:, 0] - margin <= window[2]) & (lows[:, 1] - margin <= window[3]))
+
+    for k in np.flatnonzero(near).tolist():
+        p0, p1 = points[k], points[k + 1]
+        polygon = np.array([p0 + side, p0 - side, p1 - side, p1 + side], dtype=np.int32)
+        cv2.fillConvexPoly(image, polygon, color, cv2.LINE_8, 16)
+
+    for center in (start, end):
+        if window[0] <= center[0] <= window[2] and window[1] <= center[1] <= window[3]:
+            cv2.circle(image, tuple(center.tolist()), (line_width + 1) // 2, color, -1, cv2.LINE_8)
+
+
+def _render_shared_tile(task):
+    """Worker: render one tile from the arrays shared by ``save_fractal_tiled``."""
+    coords = _SHARED_ARRAYS['coords'][1]
+    colors = _SHARED_ARRAYS['colors'][1]
+    segments = _SHARED_ARRAYS['segments'][1]
+
+    frame = np.empty(task['shape'], dtype=np.uint8)
+    frame[:] = task['background']
+
+    return render_tile(frame, task['origin'], coords, colors, segments[task['start']:task['stop']], task['line_width'])
+
+
+def _share_arrays(arrays):
+    """Copy ``arrays`` into shared memory blocks; returns ``(blocks, specs)`` for ``_attach_shared_arrays``."""
+    from multiprocessing import shared_memory
+
+    blocks, specs = [], {}
+    for name, array in arrays.items():
+        shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        blocks.append(shm)
+        specs[name] = (shm.name, array.shape, array.dtype)
+
+    return blocks, specs
+
+
+def save_fractal_tiled(fractal, init_pos, desired_recursion_level,
+                       output_file='fractal.png', size=(20000, 20000), tile_size=1024,
+                       line_width=1, cmap=None, background_color=(0, 0, 0), line_color=None, padding=50,
+                       chunk_size=None, cache_dir=None, lod_threshold=1.0, workers=None, coordinate_dtype=np.float64):
+    """
+    Render fractal to a PNG of any size without holding the image in memory.
+
+    The canvas is split into ``tile_size`` square tiles. Segments are binned
+    into the tiles they cross with a ``SegmentGrid``, each tile is rendered
+    on its own (on ``workers`` processes when given), and every row of tiles
+    is streamed to the PNG as soon as it is complete. Peak image memory is
+    one row of tiles, ``tile_size * size[0] * 3`` bytes, plus the tiles in
+    flight.
+
+    Output is pixel-identical to ``save_fractal`` with the same arguments.
+    Thick lines are drawn into a scratch frame a little larger than a tile,
+    because cv2 clipping would move their pixels. Segments longer than
+    ``THICK_PIECE`` pixels are drawn as pieces (see ``draw_thick_pieces``),
+    which can move a pixel along their edges but match across tiles.
+
+    Args:
+        fractal: Fractal object
+        init_pos: Starting position
+        desired_recursion_level: Recursion depth
+        output_file: Output filename (PNG)
+        size: (width, height) of output image
+        tile_size: Side of the square tiles in pixels
+        line_width: Thickness of lines
+        cmap: Matplotlib colormap
+        background_color: RGB tuple for background
+        padding: Padding from edges
+        chunk_size: Stream the fractal in chunks of this many edges instead of
+            generating the whole level at once
+        cache_dir: Directory of the on-disk geometry cache; reuses vertices
+            generated by earlier renders with the same fractal and level
+        lod_threshold: Level-of-detail cell size in pixels (see decimate_segments)
+        workers: Render tiles on this many processes; None or 1 renders on this process
+        coordinate_dtype: dtype of the vertices (see Fractal.compute_coordinates)
+    """
+    if not output_file.lower().endswith('.png'):
+        raise ValueError(f'Tiled rendering writes PNG files, got {output_file}')
+
+    width, height = size
+    background = np.array(background_color[::-1], dtype=np.uint8)  # BGR
+
+    # Scaled to fit
+    n, chunks = window_coordinate_chunks(fractal, desired_recursion_level, init_pos, size, padding, chunk_size,
+                                         cache_dir, coordinate_dtype)
+
+    # Colors (BGR for OpenCV)
+    lut = color_lut(cmap, line_color, bgr=True)
+
+    # Decimate chunk by chunk, so only the reduced polyline is kept; with chunk_size, this includes streaming
+    with instrument.stage('decimate', edges=n) as stage:
+        coord_parts, color_parts = [], []
+        for offset, coords in chunks:
+            m = len(coords) - 1
+            coords, colors = decimate_segments(coords, lut_colors(lut, n, offset, offset + m), lod_threshold)
+            # Each chunk starts on the previous chunk's last vertex
+            coord_parts.append(coords if offset == 0 else coords[1:])
+            color_parts.append(colors)
+            stage.advance(m)
+
+        coords = np.concatenate(coord_parts)
+        colors = np.concatenate(color_parts)
+        del coord_parts, color_parts
+
+    rows, cols = -(-height // tile_size), -(-width // tile_size)
+    with instrument.stage('bin', edges=len(colors), tiles=rows * cols):
+        # Thick lines spill over into neighboring tiles
+        grid = SegmentGrid(coords, tile_size, shape=(rows, cols), margin=line_width)
+
+    def tile_tasks():
+        for row in range(rows):
+            for col in range(cols):
+                c = row * cols + col
+                tile_height = min(tile_size, height - row * tile_size)
+                tile_width = min(tile_size, width - col * tile_size)
+                yield {
+                    'shape': (tile_height, tile_width, 3),
+                    'origin': (col * tile_size, row * tile_size),
+                    'start': int(grid.cell_starts[c]),
+                    'stop': int(grid.cell_starts[c + 1]),
+                    'background': background,
+                    'line_width': line_width,
+                }
+
+    writer = PNGStripWriter(output_file, width, height)
+    strip = None
+
+    def write_tile(index, tile):
+        nonlocal strip
+        row, col = divmod(index, cols)
+        if col == 0:
+            strip = np.empty((tile.shape[0], width, 3), dtype=np.uint8)
+        strip[:, col * tile_size:col * tile_size + tile.shape[1]] = tile
+        if col == cols - 1:
+            writer.write_rows(strip)
+
+    with instrument.stage('draw_tiles', edges=n, total=rows * cols, unit='tiles', workers=workers or 1) as stage:
+        if workers is not None and workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            blocks, specs = _share_arrays({'coords': coords, 'colors': colors, 'segments': grid.segments})
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared_arrays,
+                                         initargs=(specs,)) as pool:
+                    in_flight = []
+                    for index, task in enumerate(tile_tasks()):
+                        in_flight.append(pool.submit(_render_shared_tile, task))
+                        # Keep a bounded number of finished tiles waiting to be written
+                        if len(in_flight) > 2 * workers:
+                            write_tile(index - len(in_flight) + 1, in_flight.pop(0).result())
+                            stage.advance()
+
+                    for index in range(rows * cols - len(in_flight), rows * cols):
+                        write_tile(index, in_flight.pop(0).result())
+                        stage.advance()
+            finally:
+                for shm in blocks:
+                    shm.close()
+                    shm.unlink()
+        else:
+            for index, task in enumerate(tile_tasks()):
+                frame = np.empty(task['shape'], dtype=np.uint8)
+                frame[:] = background
+                segments = grid.segments[task['start']:task['stop']]
+                write_tile(index, render_tile(frame, task['origin'], coords, colors, segments, line_width))
+                stage.advance()
+
+        writer.close()
+
+    instrument.event('saved', output_file=output_file)
@@ -0,0 +1,257 @@
+import os
+import queue
+import shutil
+import subprocess
+import threading
+
+import numpy as np
+
+import instrument
+
+
+class OpenCVVideoWriter:
+    """
+    Video writer backed by ``cv2.VideoWriter`` (the original, always-available
+    backend). ``release`` writes the last frame ``hold_frames`` more times.
+    """
+
+    def __init__(self, output_file, fps, size, fourcc='mp4v', hold_frames=0):
+        import cv2
+
+        self.output_file = output_file
+        self.hold_frames = hold_frames
+        self._last_frame = None
+        self._writer = cv2.VideoWriter(output_file, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+
+        if not self._writer.isOpened():
+            raise RuntimeError(f'OpenCV could not open a {fourcc} video writer for {output_file}')
+
+    def write(self, frame):
+        self._writer.write(frame)
+        self._last_frame = frame
+
+    def release(self):
+
+        # OpenCV has no way to stretch a frame, so the hold is copies of it
+        if self._last_frame is not None:
+            for _ in range(self.hold_frames):
+                self._writer.write(self._last_frame)
+
+        self._writer.release()
+
+
+# x264/x265 preset names as VP9 -cpu-used values (0 slowest and best, 8 fastest), so one preset setting fits every codec
+VP9_CPU_USED = {
+    'placebo': 0, 'veryslow': 0, 'slower': 1, 'slow': 2, 'medium': 3,
+    'fast': 4, 'faster': 5, 'veryfast': 6, 'superfast': 7, 'ultrafast': 8,
+}
+
+
+def vp9_cpu_used(preset):
+    """VP9 ``-cpu-used`` value for ``preset``: an integer (or integer string), or an x264 preset name."""
+    if isinstance(preset, str) and preset in VP9_CPU_USED:
+        return VP9_CPU_USED[preset]
+
+    try:
+        return int(preset)
+    except ValueError:
+        raise ValueError(f'Unknown VP9 preset {preset!r}; use a cpu-used value 0-8 or one of {", ".join(VP9_CPU_USED)}')
+
+
+class FFmpegVideoWriter:
+    """
+    Video writer that streams raw BGR frames over stdin to a local ``ffmpeg``
+    process.
+
+    Supported codecs are ``libx264``, ``libx265`` and ``libvpx-vp9``. Use a
+    ``.webm`` output for VP9. ``crf`` trades quality for size. ``preset`` trades
+    encoder speed for compression: an x264/x265 preset name. For VP9 it is
+    the ``-cpu-used`` value, or a preset name mapped to one (see
+    ``VP9_CPU_USED``). ``threads=0`` lets ffmpeg use every core.
+
+    ``hold_frames`` extends the video by that many copies of its last frame
+    with ffmpeg's ``tpad`` filter, so a final hold is never sent over the pipe.
+    """
+
+    def __init__(self, output_file, fps, size, codec='libx264', crf=18, preset='medium',
+                 pix_fmt='yuv420p', threads=0, hold_frames=0, ffmpeg='ffmpeg'):
+
+        self.output_file = output_file
+        self.size = size
+
+        command = [
+            ffmpeg, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{size[0]}x{size[1]}', '-r', str(fps),
+            '-i', '-',
+            '-c:v', codec,
+        ]
+
+        if codec == 'libvpx-vp9':
+            # Constant-quality mode needs an unconstrained bitrate
+            command += ['-b:v', '0', '-row-mt', '1']
+            if crf is not None:
+                command += ['-crf', str(crf)]
+            if preset is not None:
+                command += ['-cpu-used', str(vp9_cpu_used(preset))]
+        else:
+            if crf is not None:
+                command += ['-crf', str(crf)]
+            if preset is not None:
+                command += ['-preset', str(preset)]
+            if codec == 'libx265':
+                # x265 logs its own banner regardless of ffmpeg's -loglevel
+                command += ['-x265-params', 'log-level=error']
+
+        filters = []
+        if pix_fmt == 'yuv420p':
+            # 4:2:0 chroma needs even dimensions
+            filters.append('pad=ceil(iw/2)*2:ceil(ih/2)*2')
+        if hold_frames:
+            filters.append(f'tpad=stop_mode=clone:stop={hold_frames}')
+        if filters:
+            command += ['-vf', ','.join(filters)]
+
+        command += ['-pix_fmt', pix_fmt, '-threads', str(threads), output_file]
+
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame):
+
+        if frame.shape[:2] != (self.size[1], self.size[0]):
+            raise ValueError(f'Frame shape {frame.shape} does not match video size {self.size}')
+
+        self._process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).data)
+
+    def release(self):
+
+        self._process.stdin.close()
+        returncode = self._process.wait()
+
+        if returncode != 0:
+            raise RuntimeError(f'ffmpeg exited with status {returncode} while writing {self.output_file}')
+
+
+VIDEO_BACKENDS = ('auto', 'ffmpeg', 'opencv')
+
+
+def resolve_backend(backend='auto', ffmpeg='ffmpeg'):
+    """Return the concrete backend (``'ffmpeg'`` or ``'opencv'``) that ``backend`` selects on this machine."""
+    if backend not in VIDEO_BACKENDS:
+        raise ValueError(f'Unknown video backend {backend!r}; expected one of {VIDEO_BACKENDS}')
+
+    if backend == 'auto':
+        return 'ffmpeg' if shutil.which(ffmpeg) else 'opencv'
+
+    return backend
+
+
+def concat_videos(segment_files, output_file, ffmpeg='ffmpeg'):
+    """Join same-format video segments into ``output_file`` in order with ffmpeg's concat demuxer, without re-encoding."""
+    list_file = f'{output_file}.segments.txt'
+
+    with open(list_file, 'w') as f:
+        for path in segment_files:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    try:
+        subprocess.run(
+            [ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', list_file, '-c', 'copy', output_file],
+            check=True,
+        )
+    finally:
+        os.remove(list_file)
+
+
+def open_video_writer(output_file, fps, size, backend='auto', hold_frames=0, **options):
+    """
+    Open a video writer for ``output_file``.
+
+    ``backend`` is ``'ffmpeg'``, ``'opencv'``, or ``'auto'``. Auto uses ffmpeg
+    when it is on the PATH and falls back to OpenCV otherwise. ``options`` go
+    to the backend's constructor, e.g. ``codec``, ``crf``, ``preset`` and
+    ``threads`` for ffmpeg, or ``fourcc`` for OpenCV. Options meant for the
+    other backend are ignored, so one set of options works with ``'auto'``.
+    Either backend shows the last frame for ``hold_frames`` more frames.
+    """
+    ffmpeg = options.pop('ffmpeg', 'ffmpeg')
+    fourcc = options.pop('fourcc', 'mp4v')
+
+    if resolve_backend(backend, ffmpeg) == 'ffmpeg':
+        options = {key: value for key, value in options.items() if value is not None}
+        instrument.event('video_encoder', backend='ffmpeg', codec=options.get('codec', 'libx264'))
+        return FFmpegVideoWriter(output_file, fps, size, hold_frames=hold_frames, ffmpeg=ffmpeg, **options)
+
+    instrument.event('video_encoder', backend='opencv', codec=fourcc)
+    return OpenCVVideoWriter(output_file, fps, size, fourcc=fourcc, hold_frames=hold_frames)
+
+
+class BackgroundVideoWriter:
+    """
+    Producer/consumer wrapper around a video writer (anything with
+    ``write(frame)`` and ``release()``, e.g. one from ``open_video_writer``).
+
+    ``write`` copies the frame into a bounded queue and returns right away. An
+    encoder thread drains the queue, so drawing the next frame overlaps with
+    encoding the previous one. OpenCV releases the GIL while encoding. When
+    the encoder falls behind, the bounded queue applies back-pressure instead
+    of buffering the whole video in memory.
+
+    A frame written with ``repeat=k`` is copied and queued once. The encoder
+    submits it ``k`` times, so a hold between scenes costs the drawing thread
+    nothing. A final hold is cheaper still as the writer's ``hold_frames``.
+    """
+
+    _STOP = object()
+
+    def __init__(self, writer, max_queue=8):
+
+        self.writer = writer
+        self.frames_written = 0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._thread = threading.Thread(target=self._encode, name='video-encoder', daemon=True)
+        self._thread.start()
+
+    def _encode(self):
+
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+
+            if self._error is not None:
+                # Keep draining so the producer never blocks on a dead encoder
+                continue
+
+            frame, repeat = item
+            try:
+                for _ in range(repeat):
+                    self.writer.write(frame)
+                    self.frames_written += 1
+            except Exception as error:
+                self._error = error
+
+    def write(self, frame, repeat=1):
+
+        if self._error is not None:
+            raise self._error
+
+        # The producer keeps drawing on its frame, so hand the encoder a snapshot
+        self._queue.put((frame.copy(), repeat))
+
+    def release(self):
+        """Wait for every queued frame to be encoded, then release the underlying writer."""
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self.writer.release()
+
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()